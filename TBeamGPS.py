@@ -1,16 +1,17 @@
 import time
 import axp202
+import constants
 import machine
 
 GPS_RX_PIN = 34
 GPS_TX_PIN = 12
 
-axp = axp202.PMU(address=axp202.AXP192_SLAVE_ADDRESS)
-# axp.setDCDC1Voltage(3300) # esp32 core VDD    3v3
-axp.setLDO2Voltage(3300)   # T-Beam LORA VDD   3v3
-axp.setLDO3Voltage(3300)   # T-Beam GPS  VDD    3v3
-axp.enablePower(axp202.AXP192_LDO3)
-axp.enablePower(axp202.AXP192_LDO2)
+# ldo2: T-Beam LORA VDD 3v3, ldo3: T-Beam GPS VDD 3v3
+GPS_LORA = axp202.PowerProfile(rails={'ldo2': 3300, 'ldo3': 3300},
+                               on=('ldo2', 'ldo3'))
+
+axp = axp202.PMU(address=constants.AXP192_SLAVE_ADDRESS)
+axp.apply_profile(GPS_LORA)
 
 
 uart = machine.UART(2, rx=GPS_RX_PIN, tx=GPS_TX_PIN, baudrate=9600, bits=8, parity=None, stop=1, timeout=1500, buffer_size=1024, lineend='\r\n')
@@ -28,54 +28,581 @@ github:https://github.com/lewisxhe/AXP202X_Libraries
 
 
 import gc
-from machine import Pin, I2C
+import math
+import time
+from machine import Pin, I2C, RTC
 import micropython
+from micropython import const
 from ustruct import unpack
-
-from constants import *
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+# Private copies of the registers and values the driver uses. const()
+# names with a leading underscore are folded into the bytecode and take
+# no globals slot, so importing the driver does not load constants.py.
+# Scripts import constants; where the port has module __getattr__
+# (MICROPY_MODULE_GETATTR) axp202.AXP202_LDO2 and friends still work.
+_AXP202_SLAVE_ADDRESS = const(0x35)
+_AXP202_CHIP_ID = const(0x41)
+_AXP192_CHIP_ID = const(0x03)
+_AXP202_STATUS = const(0x00)
+_AXP202_MODE_CHGSTATUS = const(0x01)
+_AXP202_IC_TYPE = const(0x03)
+_AXP202_DATA_BUFFER1 = const(0x04)
+_AXP202_DATA_BUFFER3 = const(0x06)
+_AXP202_DATA_BUFFER8 = const(0x0B)
+_AXP202_DATA_BUFFERC = const(0x0F)
+_AXP202_LDO234_DC23_CTL = const(0x12)
+_AXP202_DC2OUT_VOL = const(0x23)
+_AXP202_DC3OUT_VOL = const(0x27)
+_AXP202_LDO24OUT_VOL = const(0x28)
+_AXP202_LDO3OUT_VOL = const(0x29)
+_AXP202_OFF_CTL = const(0x32)
+_AXP202_CHARGE1 = const(0x33)
+_AXP202_POK_SET = const(0x36)
+_AXP202_VLTF_CHGSET = const(0x38)
+_AXP202_VHTF_CHGSET = const(0x39)
+_AXP202_APS_WARNING1 = const(0x3A)
+_AXP202_APS_WARNING2 = const(0x3B)
+_AXP202_TLTF_DISCHGSET = const(0x3C)
+_AXP202_THTF_DISCHGSET = const(0x3D)
+_AXP202_DCDC_MODESET = const(0x80)
+_AXP202_ADC_EN1 = const(0x82)
+_AXP202_ADC_EN2 = const(0x83)
+_AXP202_ADC_SPEED = const(0x84)
+_AXP202_ADC_INPUTRANGE = const(0x85)
+_AXP202_ADC_IRQ_FETFSET = const(0x87)
+_AXP202_TIMER_CTL = const(0x8A)
+_AXP202_GPIO0_CTL = const(0x90)
+_AXP202_GPIO2_CTL = const(0x93)
+_AXP202_INTEN1 = const(0x40)
+_AXP202_INTEN2 = const(0x41)
+_AXP202_INTEN3 = const(0x42)
+_AXP202_INTEN4 = const(0x43)
+_AXP202_INTEN5 = const(0x44)
+_AXP202_INTSTS1 = const(0x48)
+_AXP192_INTEN1 = const(0x40)
+_AXP192_INTEN2 = const(0x41)
+_AXP192_INTEN3 = const(0x42)
+_AXP192_INTEN4 = const(0x43)
+_AXP192_INTEN5 = const(0x4A)
+_AXP192_INTSTS1 = const(0x44)
+_AXP192_INTSTS5 = const(0x4D)
+_AXP192_LDO23OUT_VOL = const(0x28)
+_AXP192_DC1_VLOTAGE = const(0x26)
+_AXP202_BAT_AVERVOL_H8 = const(0x78)
+_AXP202_BAT_AVERCHGCUR_H8 = const(0x7A)
+_AXP202_ACIN_VOL_H8 = const(0x56)
+_AXP202_ACIN_CUR_H8 = const(0x58)
+_AXP202_VBUS_VOL_H8 = const(0x5A)
+_AXP202_VBUS_CUR_H8 = const(0x5C)
+_AXP202_INTERNAL_TEMP_H8 = const(0x5E)
+_AXP202_TS_IN_H8 = const(0x62)
+_AXP202_GPIO0_VOL_ADC_H8 = const(0x64)
+_AXP202_GPIO1_VOL_ADC_H8 = const(0x66)
+_AXP202_BAT_AVERDISCHGCUR_H8 = const(0x7C)
+_AXP202_APS_AVERVOL_H8 = const(0x7E)
+_AXP202_BAT_CHGCOULOMB3 = const(0xB0)
+_AXP202_COULOMB_CTL = const(0xB8)
+_AXP202_BAT_POWERH8 = const(0x70)
+_AXP202_BATT_PERCENTAGE = const(0xB9)
+_AXP202_BATT_VOLTAGE_STEP = 1.1
+_AXP202_BATT_DISCHARGE_CUR_STEP = 0.5
+_AXP202_BATT_CHARGE_CUR_STEP = 0.5
+_AXP202_ACIN_VOLTAGE_STEP = 1.7
+_AXP202_ACIN_CUR_STEP = 0.625
+_AXP202_VBUS_VOLTAGE_STEP = 1.7
+_AXP202_VBUS_CUR_STEP = 0.375
+_AXP202_INTENAL_TEMP_STEP = 0.1
+_AXP202_APS_VOLTAGE_STEP = 1.4
+_AXP202_TS_PIN_OUT_STEP = 0.8
+_AXP202_GPIO0_STEP = 0.5
+_AXP202_GPIO1_STEP = 0.5
+_AXP202_EXTEN = const(0)
+_AXP202_DCDC3 = const(1)
+_AXP202_LDO2 = const(2)
+_AXP202_LDO4 = const(3)
+_AXP202_DCDC2 = const(4)
+_AXP202_LDO3 = const(6)
+_AXP192_DCDC1 = const(0)
+_AXP192_DCDC3 = const(1)
+_AXP192_LDO2 = const(2)
+_AXP192_LDO3 = const(3)
+_AXP192_DCDC2 = const(4)
+_AXP192_EXTEN = const(6)
+_AXP202_BATT_LOW_TEMP_IRQ = const(1 << 8)
+_AXP202_BATT_OVER_TEMP_IRQ = const(1 << 9)
+_AXP202_APS_LOW_VOL_LEVEL2_IRQ = const(1 << 24)
+_APX202_APS_LOW_VOL_LEVEL1_IRQ = const(1 << 25)
+_AXP202_TIMER_TIMEOUT_IRQ = 1 << 39
+_AXP192_TIMER_TIMEOUT_IRQ = 1 << 31
+_AXP202_LDO3_DCIN_MODE = const(1)
+_AXP202_LDO4_3300MV = const(15)
+_AXP202_STARTUP_TIME_2S = const(3)
+_AXP202_LONGPRESS_TIME_2S5 = const(3)
+_AXP202_SHUTDOWN_TIME_10S = const(3)
+_AXP202_TARGET_VOL_4_36V = const(3)
+_AXP20X_LED_OFF = const(0)
+_AXP20X_LED_BLINK_1HZ = const(1)
+_AXP20X_LED_BLINK_4HZ = const(2)
+_AXP20X_LED_LOW_LEVEL = const(3)
+_AXP_ADC_SAMPLING_RATE_200HZ = const(3)
+_AXP_TS_PIN_CURRENT_80UA = const(3)
+_AXP_TS_PIN_FUNCTION_BATT = const(0)
+_AXP_TS_PIN_FUNCTION_ADC = const(1)
+_AXP_TS_PIN_MODE_ENABLE = const(3)
+_AXP_GPIO_ADC_RANGE_0V7_2V7 = const(1)
 
 default_pin_scl = 22
 default_pin_sda = 21
 default_pin_intr = 35
-default_chip_type = AXP202_CHIP_ID
+default_chip_type = _AXP202_CHIP_ID
+
+# RTC memory tag for the cached chip ID, followed by the ID byte
+_PROBE_TAG = b'AXPc'
+
+
+def __getattr__(name):
+    import constants
+    return getattr(constants, name)
+
+class _AXP202(object):
+    # Register layout of one chip variant, resolved once by init_device.
+    # Adding a variant means adding a class like this to _PROFILES.
+    name = 'AXP202'
+    # low bits of the battery charge current ADC (h8_l4 or h8_l5)
+    chg_bits = 4
+    # IRQ status as (first register, offset in irqbuf, count) runs
+    irq_status = ((_AXP202_INTSTS1, 0, 5),)
+    irq_enable = (_AXP202_INTEN1, _AXP202_INTEN2, _AXP202_INTEN3,
+                  _AXP202_INTEN4, _AXP202_INTEN5)
+    # Control registers that are only ever changed by the host. With the
+    # shadow cache enabled these are served from RAM and written through.
+    # Status, ADC and IRQ status registers are never cached.
+    cache_ranges = (
+        (_AXP202_LDO234_DC23_CTL, _AXP202_LDO234_DC23_CTL),
+        (_AXP202_DC2OUT_VOL, _AXP202_THTF_DISCHGSET),
+        (_AXP202_INTEN1, _AXP202_INTEN5),
+        (_AXP202_DCDC_MODESET, _AXP202_ADC_IRQ_FETFSET),
+        # GPIO control only, 0x94 and 0x95 carry live GPIO input levels
+        (_AXP202_GPIO0_CTL, _AXP202_GPIO2_CTL),
+    )
+    # registers restore() may write back: the cached control registers
+    # plus the battery-backed data buffer
+    restore_ranges = cache_ranges + ((_AXP202_DATA_BUFFER1, _AXP202_DATA_BUFFERC),)
+    # rail: (register, field mask, shift, min mV, max mV, step mV), the
+    # field value is (mv - min) // step. A 0xFF mask writes the register
+    # without reading it first.
+    rails = {
+        'dc2': (_AXP202_DC2OUT_VOL, 0xFF, 0, 700, 2275, 25),
+        'dc3': (_AXP202_DC3OUT_VOL, 0xFF, 0, 700, 3500, 25),
+        'ldo2': (_AXP202_LDO24OUT_VOL, 0xF0, 4, 1800, 3300, 100),
+        'ldo3': (_AXP202_LDO3OUT_VOL, 0x7F, 0, 700, 3500, 25),
+    }
+    # output: enable bit in AXP202_LDO234_DC23_CTL
+    outputs = {
+        'exten': _AXP202_EXTEN,
+        'dc3': _AXP202_DCDC3,
+        'ldo2': _AXP202_LDO2,
+        'ldo4': _AXP202_LDO4,
+        'dc2': _AXP202_DCDC2,
+        'ldo3': _AXP202_LDO3,
+    }
+    # charge current in mA for each value of the CHARGE1 low nibble
+    chg_currents = tuple(range(300, 1900, 100))
+    has_ldo4 = True
+    # APS low voltage warning levels, each with its own IRQ
+    aps_levels = 2
+    timer_irq = _AXP202_TIMER_TIMEOUT_IRQ
+
+
+class _AXP192(object):
+    name = 'AXP192'
+    chg_bits = 5
+    irq_status = ((_AXP192_INTSTS1, 0, 4), (_AXP192_INTSTS5, 4, 1))
+    irq_enable = (_AXP192_INTEN1, _AXP192_INTEN2, _AXP192_INTEN3,
+                  _AXP192_INTEN4, _AXP192_INTEN5)
+    cache_ranges = (
+        (_AXP202_LDO234_DC23_CTL, _AXP202_LDO234_DC23_CTL),
+        (_AXP202_DC2OUT_VOL, _AXP202_THTF_DISCHGSET),
+        (_AXP192_INTEN1, _AXP192_INTEN4),
+        (_AXP192_INTEN5, _AXP192_INTEN5),
+        (_AXP202_DCDC_MODESET, _AXP202_ADC_IRQ_FETFSET),
+        (_AXP202_GPIO0_CTL, _AXP202_GPIO2_CTL),
+    )
+    restore_ranges = cache_ranges + ((_AXP202_DATA_BUFFER3, _AXP202_DATA_BUFFER8),)
+    rails = {
+        'dc1': (_AXP192_DC1_VLOTAGE, 0xFF, 0, 700, 3500, 25),
+        'dc2': (_AXP202_DC2OUT_VOL, 0xFF, 0, 700, 2275, 25),
+        'dc3': (_AXP202_DC3OUT_VOL, 0xFF, 0, 700, 3500, 25),
+        'ldo2': (_AXP192_LDO23OUT_VOL, 0xF0, 4, 1800, 3300, 100),
+        'ldo3': (_AXP192_LDO23OUT_VOL, 0x0F, 0, 1800, 3300, 100),
+    }
+    outputs = {
+        'dc1': _AXP192_DCDC1,
+        'dc3': _AXP192_DCDC3,
+        'ldo2': _AXP192_LDO2,
+        'ldo3': _AXP192_LDO3,
+        'dc2': _AXP192_DCDC2,
+        'exten': _AXP192_EXTEN,
+    }
+    chg_currents = (100, 190, 280, 360, 450, 550, 630, 700,
+                    780, 880, 960, 1000, 1080, 1160, 1240, 1320)
+    has_ldo4 = False
+    aps_levels = 1
+    timer_irq = _AXP192_TIMER_TIMEOUT_IRQ
+
+
+_PROFILES = {
+    _AXP202_CHIP_ID: _AXP202,
+    _AXP192_CHIP_ID: _AXP192,
+}
+
+
+# ADC channel descriptors: (name, first register, width in bits, scale,
+# offset, unit, integer numerator, integer denominator, integer offset,
+# integer unit). value = raw * scale + offset, where raw is H8 plus the
+# low 4 or 5 bits of the next register (12/13 bit) or three whole bytes
+# (24). In integer mode value = raw * num // den + offset, which stays a
+# small int on MicroPython. Adding a channel only takes a row here.
+ADC_CHANNELS = (
+    ('acin_voltage', _AXP202_ACIN_VOL_H8, 12, _AXP202_ACIN_VOLTAGE_STEP, 0, 'mV', 17, 10, 0, 'mV'),
+    ('acin_current', _AXP202_ACIN_CUR_H8, 12, _AXP202_ACIN_CUR_STEP, 0, 'mA', 5, 8, 0, 'mA'),
+    ('vbus_voltage', _AXP202_VBUS_VOL_H8, 12, _AXP202_VBUS_VOLTAGE_STEP, 0, 'mV', 17, 10, 0, 'mV'),
+    ('vbus_current', _AXP202_VBUS_CUR_H8, 12, _AXP202_VBUS_CUR_STEP, 0, 'mA', 3, 8, 0, 'mA'),
+    ('temp', _AXP202_INTERNAL_TEMP_H8, 12, _AXP202_INTENAL_TEMP_STEP, -144.7, 'C', 1, 1, -1447, 'dC'),
+    ('ts_temp', _AXP202_TS_IN_H8, 12, _AXP202_TS_PIN_OUT_STEP, 0, 'mV', 4, 5, 0, 'mV'),
+    ('gpio0_voltage', _AXP202_GPIO0_VOL_ADC_H8, 12, _AXP202_GPIO0_STEP, 0, 'mV', 1, 2, 0, 'mV'),
+    ('gpio1_voltage', _AXP202_GPIO1_VOL_ADC_H8, 12, _AXP202_GPIO1_STEP, 0, 'mV', 1, 2, 0, 'mV'),
+    ('batt_inpower', _AXP202_BAT_POWERH8, 24, 2 * 1.1 * 0.5 / 1000, 0, 'mW', 11, 10, 0, 'uW'),
+    ('batt_voltage', _AXP202_BAT_AVERVOL_H8, 12, _AXP202_BATT_VOLTAGE_STEP, 0, 'mV', 11, 10, 0, 'mV'),
+    ('batt_charge_current', _AXP202_BAT_AVERCHGCUR_H8, 12, _AXP202_BATT_CHARGE_CUR_STEP, 0, 'mA', 1, 2, 0, 'mA'),
+    ('batt_discharge_current', _AXP202_BAT_AVERDISCHGCUR_H8, 13, _AXP202_BATT_DISCHARGE_CUR_STEP, 0, 'mA', 1, 2, 0, 'mA'),
+    ('aps_voltage', _AXP202_APS_AVERVOL_H8, 12, _AXP202_APS_VOLTAGE_STEP, 0, 'mV', 7, 5, 0, 'mV'),
+)
+
+_CHANNEL_INDEX = dict((row[0], i) for i, row in enumerate(ADC_CHANNELS))
+_ACIN_VOLTAGE = _CHANNEL_INDEX['acin_voltage']
+_ACIN_CURRENT = _CHANNEL_INDEX['acin_current']
+_VBUS_VOLTAGE = _CHANNEL_INDEX['vbus_voltage']
+_VBUS_CURRENT = _CHANNEL_INDEX['vbus_current']
+_TEMP = _CHANNEL_INDEX['temp']
+_TS_TEMP = _CHANNEL_INDEX['ts_temp']
+_GPIO0_VOLTAGE = _CHANNEL_INDEX['gpio0_voltage']
+_GPIO1_VOLTAGE = _CHANNEL_INDEX['gpio1_voltage']
+_BATT_INPOWER = _CHANNEL_INDEX['batt_inpower']
+_BATT_VOLTAGE = _CHANNEL_INDEX['batt_voltage']
+_BATT_CHARGE_CURRENT = _CHANNEL_INDEX['batt_charge_current']
+_BATT_DISCHARGE_CURRENT = _CHANNEL_INDEX['batt_discharge_current']
+_APS_VOLTAGE = _CHANNEL_INDEX['aps_voltage']
+
+
+class Reading(object):
+    # Decoded channel values, by name or position: r['vbus_voltage'],
+    # r.vbus_voltage or r[2]. The names tuple is shared, not copied.
+
+    def __init__(self, names, values):
+        self.names = names
+        self.values = values
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.values[self.names.index(key)]
+        return self.values[key]
+
+    def __getattr__(self, name):
+        try:
+            return self.values[self.names.index(name)]
+        except ValueError:
+            raise AttributeError(name)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def keys(self):
+        return self.names
+
+    def items(self):
+        return zip(self.names, self.values)
+
+
+class _Selection(object):
+    # A set of channels read with one burst spanning their registers
+
+    def __init__(self, pmu, names):
+        self.names = tuple(names)
+        self.channels = tuple(_CHANNEL_INDEX[name] for name in self.names)
+        regs = [ADC_CHANNELS[ch][1] for ch in self.channels]
+        ends = [ADC_CHANNELS[ch][1] + pmu.adc_size[ch] for ch in self.channels]
+        self.first = min(regs)
+        self.buf = bytearray(max(ends) - self.first)
+        self.offsets = tuple(reg - self.first for reg in regs)
+        self.gpio = _GPIO0_VOLTAGE in self.channels or \
+            _GPIO1_VOLTAGE in self.channels
+
+
+def _pair_frame(regs, values):
+    # Data for writeto_mem(addr, regs[0], frame) writing values[i] to
+    # regs[i]: value 0, then (register, value) for each further register
+    frame = bytearray(2 * len(regs) - 1)
+    frame[0] = values[0]
+    for i in range(1, len(regs)):
+        frame[2 * i - 1] = regs[i]
+        frame[2 * i] = values[i]
+    return frame
+
+
+class _Batch(object):
+    def __init__(self, pmu):
+        self.pmu = pmu
+
+    def __enter__(self):
+        self.pmu.begin()
+        return self.pmu
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.pmu.commit()
+        else:
+            self.pmu.abort()
+        return False
+
+
+# Register access and decode helpers a threadsafe PMU leaves unwrapped,
+# locked methods call them many times per operation. Other threads call
+# them inside "with pmu.bus_lock:".
+_UNLOCKED = ('init_pins', 'init_i2c', 'init_device', 'read_byte',
+             'write_byte', 'read_word', 'read_word2', 'read_block',
+             'write_block', 'write_regs', 'decodeRaw', 'decode', 'convert',
+             'select', 'batch', 'serviceIRQ')
+
+
+class _BusLock(object):
+    # Re-entrant lock around PMU operations: the owning thread may nest
+    # calls, other threads block. Without _thread only re-entrancy from
+    # scheduled callbacks is tracked.
+    def __init__(self, idle_cb):
+        self.lock = _thread.allocate_lock() if _thread else None
+        self.owner = None
+        self.depth = 0
+        self.deferred = False
+        self.idle_cb = idle_cb
+
+    def ident(self):
+        return _thread.get_ident() if _thread else 0
+
+    def held(self):
+        # True when the calling thread is already inside an operation,
+        # i.e. a scheduled callback interrupted it between bytecodes
+        return self.depth > 0 and self.owner == self.ident()
+
+    def acquire(self):
+        me = self.ident()
+        if self.depth > 0 and self.owner == me:
+            self.depth += 1
+            return
+        if self.lock:
+            self.lock.acquire()
+        self.owner = me
+        self.depth = 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth > 0:
+            return
+        self.owner = None
+        if self.lock:
+            self.lock.release()
+        if self.deferred:
+            self.deferred = False
+            try:
+                micropython.schedule(self.idle_cb, None)
+            except RuntimeError:
+                # schedule queue full, the next release tries again
+                self.deferred = True
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+
+class PowerProfile(object):
+    # A declarative power state for PMU.apply_profile(). Rails and outputs
+    # use the chip-neutral names of the chip profiles ('dc1', 'ldo2',
+    # 'exten', ...), anything left as None or unlisted is not touched:
+    #   gps = PowerProfile(rails={'ldo2': 3300, 'ldo3': 3300},
+    #                      on=('ldo2', 'ldo3'), led=AXP20X_LED_BLINK_1HZ)
+    #   sleep = PowerProfile(off=('ldo2', 'ldo3'), led=AXP20X_LED_OFF)
+    def __init__(self, rails=None, on=(), off=(), led=None, charge=None,
+                 charge_target=None, charge_current=None):
+        self.rails = rails if rails is not None else {}
+        self.on = tuple(on)
+        self.off = tuple(off)
+        self.led = led
+        self.charge = charge
+        self.charge_target = charge_target
+        self.charge_current = charge_current
 
 
 class PMU(object):
     def __init__(self, scl=None, sda=None,
-                 intr=None, address=None):
+                 intr=None, address=None, cache=False, integer=False,
+                 chip=None, probe_cache=False, log=print, threadsafe=False,
+                 i2c=None):
         self.device = None
         self.scl = scl if scl is not None else default_pin_scl
         self.sda = sda if sda is not None else default_pin_sda
         self.intr = intr if intr is not None else default_pin_intr
-        self.chip = default_chip_type
-        self.address = address if address else AXP202_SLAVE_ADDRESS
+        self.chip = chip
+        self.probe_cache = probe_cache
+        self.log = log
+        self.address = address if address else _AXP202_SLAVE_ADDRESS
+        # an existing machine.I2C, or an i2cbus.I2CBus shared with others
+        self.i2c = i2c
 
         self.buffer = bytearray(16)
         self.bytebuf = memoryview(self.buffer[0:1])
         self.wordbuf = memoryview(self.buffer[0:2])
         self.irqbuf = memoryview(self.buffer[0:5])
+        self.chanbuf = bytearray(3)
+        self.coulombbuf = bytearray(8)
+
+        # ADC configuration, read lazily. The ADC registers only change
+        # once per sample period, so snapshot() reuses its last result
+        # until a new conversion can have happened.
+        self.adc_rate = None
+        self.adc_range = None
+        self.adc_width = [row[2] for row in ADC_CHANNELS]
+        self.adc_size = [3 if row[2] == 24 else 2 for row in ADC_CHANNELS]
+        self.adc_scale = [row[3] for row in ADC_CHANNELS]
+        self.adc_offset = [row[4] for row in ADC_CHANNELS]
+        self.adc_num = [row[6] for row in ADC_CHANNELS]
+        self.adc_den = [row[7] for row in ADC_CHANNELS]
+        self.adc_ioffset = [row[8] for row in ADC_CHANNELS]
+        self.integer = integer
+        self.chanviews = [memoryview(self.chanbuf)[0:n] for n in self.adc_size]
+        self.adc_stamp = 0
+        self.last_snapshot = None
+
+        # IRQ event dispatch, service_cb is bound once so the pin handler
+        # does not allocate a bound method in interrupt context
+        self.irq_handlers = []
+        self.service_cb = self.serviceIRQ
+
+        # register shadow: cacheable marks registers eligible for caching,
+        # cached marks the ones whose shadow value is currently valid
+        self.cache = cache
+        self.shadow = bytearray(256)
+        self.cacheable = bytearray(256)
+        self.cached = bytearray(256)
+
+        # pending register writes while a batch is open
+        self.pending = None
+        self.batch_depth = 0
+        # pending writes of the enclosing batch at each nested begin()
+        self.batch_saved = []
+        self.bus_lock = None
 
         self.init_pins()
         self.init_i2c()
         self.init_device()
 
+        # With threadsafe every public method outside _UNLOCKED runs under
+        # bus_lock, so a read-modify-write or a batch is never interleaved
+        # with another thread, and an IRQ scheduled mid-operation is
+        # deferred until the operation ends rather than sharing its scratch
+        # buffers. Other calls made mid-operation by the same thread, nested
+        # ones or a scheduled Timer callback alike, get the scratch buffers
+        # of their nesting level. "with pmu.bus_lock:" groups several calls
+        # into one operation.
+        if threadsafe:
+            self.bus_lock = _BusLock(self.service_cb)
+            self.scratch = [None, (self.bytebuf, self.wordbuf, self.chanviews,
+                                   self.coulombbuf, self.all_channels)]
+            self.scratch_level = 1
+            for name in dir(type(self)):
+                if name.startswith('_') or name in _UNLOCKED:
+                    continue
+                method = getattr(self, name)
+                if callable(method):
+                    setattr(self, name, self.__locked(method))
+
+    def __locked(self, method):
+        lock = self.bus_lock
+
+        def call(*args, **kwargs):
+            nested = lock.held()
+            lock.acquire()
+            if nested:
+                level = self.scratch_level
+                self.__use_scratch(level + 1)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                if nested:
+                    self.__use_scratch(level)
+                lock.release()
+        return call
+
+    def __use_scratch(self, level):
+        # Switch to the scratch buffers of a nesting level, made on first use
+        scratch = self.scratch
+        while len(scratch) <= level:
+            chanbuf = bytearray(3)
+            scratch.append((memoryview(bytearray(1)), memoryview(bytearray(2)),
+                            [memoryview(chanbuf)[0:n] for n in self.adc_size],
+                            bytearray(8), _Selection(self, self.all_channels.names)))
+        self.bytebuf, self.wordbuf, self.chanviews, self.coulombbuf, \
+            self.all_channels = scratch[level]
+        self.scratch_level = level
+
     def init_i2c(self):
-        print('* initializing i2c')
-        self.bus = I2C(scl=self.pin_scl,
-                       sda=self.pin_sda)
+        if self.log:
+            self.log('* initializing i2c')
+        if self.i2c is None:
+            self.bus = I2C(scl=self.pin_scl,
+                           sda=self.pin_sda)
+        elif hasattr(self.i2c, 'device'):
+            self.bus = self.i2c.device(self.address)
+        else:
+            self.bus = self.i2c
 
     def init_pins(self):
-        print('* initializing pins')
-        self.pin_sda = Pin(self.sda)
-        self.pin_scl = Pin(self.scl)
+        if self.log:
+            self.log('* initializing pins')
+        if self.i2c is None:
+            self.pin_sda = Pin(self.sda)
+            self.pin_scl = Pin(self.scl)
         self.pin_intr = Pin(self.intr, mode=Pin.IN)
 
     def write_byte(self, reg, val):
+        if self.pending is not None:
+            self.pending[reg] = val & 0xFF
+            return
         self.bytebuf[0] = val
         self.bus.writeto_mem(self.address, reg, self.bytebuf)
+        if self.cacheable[reg]:
+            self.shadow[reg] = val
+            self.cached[reg] = 1
 
     def read_byte(self, reg):
+        if self.pending is not None and reg in self.pending:
+            return self.pending[reg]
+        if self.cached[reg]:
+            return self.shadow[reg]
         self.bus.readfrom_mem_into(self.address, reg, self.bytebuf)
+        if self.cacheable[reg]:
+            self.shadow[reg] = self.bytebuf[0]
+            self.cached[reg] = 1
         return self.bytebuf[0]
 
     def read_word(self, reg):
@@ -86,287 +613,638 @@ class PMU(object):
         self.bus.readfrom_mem_into(self.address, reg, self.wordbuf)
         return unpack('>h', self.wordbuf)[0]
 
-    def init_device(self):
-        print('* initializing mpu')
-        self.chip = self.read_byte(AXP202_IC_TYPE)
-        if(self.chip == AXP202_CHIP_ID):
-            self.chip = AXP202_CHIP_ID
-            print("Detect PMU Type is AXP202")
-        elif(self.chip == AXP192_CHIP_ID):
-            print("Detect PMU Type is AXP192")
-            self.chip = AXP192_CHIP_ID
+    def read_block(self, reg, buf):
+        self.bus.readfrom_mem_into(self.address, reg, buf)
+        return buf
+
+    def write_block(self, reg, buf):
+        # len(buf) registers from reg in one transaction
+        self.write_regs(range(reg, reg + len(buf)), buf)
+
+    def write_regs(self, regs, values):
+        # Any set of registers in one transaction. AXP20x multi-byte writes
+        # are register/data pairs, the register address does not
+        # auto-increment on writes as it does on reads.
+        self.bus.writeto_mem(self.address, regs[0], _pair_frame(regs, values))
+        for i in range(len(regs)):
+            if self.cacheable[regs[i]]:
+                self.shadow[regs[i]] = values[i]
+                self.cached[regs[i]] = 1
+
+    def batch(self):
+        return _Batch(self)
+
+    def begin(self):
+        # a threadsafe PMU keeps the bus locked until commit() or abort()
+        if self.bus_lock is not None:
+            self.bus_lock.acquire()
+        if self.pending is None:
+            self.pending = {}
+        else:
+            self.batch_saved.append(dict(self.pending))
+        self.batch_depth += 1
+
+    def abort(self):
+        # Drop the writes of the innermost batch, an enclosing batch keeps
+        # what it had pending before the inner begin()
+        if self.pending is None:
+            return
+        self.batch_depth -= 1
+        if self.bus_lock is not None:
+            self.bus_lock.release()
+        if self.batch_depth > 0:
+            self.pending = self.batch_saved.pop()
         else:
+            self.pending = None
+
+    def commit(self):
+        # Write every register touched since begin() exactly once, all of
+        # them in a single transaction
+        if self.pending is None:
+            return
+        self.batch_depth -= 1
+        if self.bus_lock is not None:
+            self.bus_lock.release()
+        if self.batch_depth > 0:
+            self.batch_saved.pop()
+            return
+        pending = self.pending
+        self.pending = None
+        self.__send(pending)
+
+    def __send(self, pending):
+        regs = sorted(reg for reg in pending
+                      if not (self.cached[reg] and self.shadow[reg] == pending[reg]))
+        if len(regs) == 1:
+            self.write_byte(regs[0], pending[regs[0]])
+        elif regs:
+            self.write_regs(regs, [pending[reg] for reg in regs])
+
+    def __unbatch(self):
+        # Write out an open batch and set it aside, for callers whose write
+        # order matters: commit() sends registers in address order
+        if self.pending is None:
+            return None
+        state = (self.pending, self.batch_depth, self.batch_saved)
+        self.pending = None
+        self.batch_depth = 0
+        self.batch_saved = []
+        self.__send(state[0])
+        return state
+
+    def __rebatch(self, state):
+        # reopen the batch set aside by __unbatch(), its writes are final
+        if state is not None:
+            self.pending = {}
+            self.batch_depth = state[1]
+            self.batch_saved = [{} for _ in state[2]]
+
+    def init_device(self):
+        if self.log:
+            self.log('* initializing mpu')
+        if self.chip is None:
+            self.chip = self.__probe()
+        profile = _PROFILES.get(self.chip)
+        if profile is None:
             raise Exception("Invalid Chip ID!")
+        if self.log:
+            self.log("Detect PMU Type is " + profile.name)
+        if hasattr(self.i2c, 'device'):
+            self.i2c.device(self.address, profile.name)
+        self.profile = profile
+        self.rails = profile.rails
+        self.chg_bits = profile.chg_bits
+        self.adc_width[_BATT_CHARGE_CURRENT] = 8 + profile.chg_bits
+        # every channel in one burst, 0x56 (ACIN voltage) .. 0x7F (APS voltage)
+        self.all_channels = _Selection(self, [row[0] for row in ADC_CHANNELS])
+        self.snapshot_names = self.all_channels.names + ('batt_percentage',)
+        # memoryview slices and the pair frames that clear a run are built
+        # once so IRQ handling does not allocate
+        self.irq_runs = tuple((reg, self.irqbuf[off:off + n],
+                               _pair_frame(range(reg, reg + n), b'\xff' * n),
+                               _pair_frame(range(reg, reg + n), bytes(n)))
+                              for reg, off, n in profile.irq_status)
+        if self.cache:
+            self.enableCache()
+
+    def __probe(self):
+        # With probe_cache the chip ID survives deep sleep in RTC memory,
+        # which is only claimed when empty or already holding our tag
+        if not self.probe_cache:
+            return self.read_byte(_AXP202_IC_TYPE)
+        rtc = RTC()
+        mem = rtc.memory()
+        if len(mem) == 5 and mem[:4] == _PROBE_TAG and mem[4] in _PROFILES:
+            return mem[4]
+        chip = self.read_byte(_AXP202_IC_TYPE)
+        if not mem or mem[:4] == _PROBE_TAG:
+            rtc.memory(_PROBE_TAG + bytes((chip,)))
+        return chip
+
+    def enableCache(self):
+        self.invalidateCache()
+        for first, last in self.profile.cache_ranges:
+            for reg in range(first, last + 1):
+                self.cacheable[reg] = 1
+        self.cache = True
+        self.syncCache()
+
+    def disableCache(self):
+        self.cache = False
+        for reg in range(256):
+            self.cacheable[reg] = 0
+            self.cached[reg] = 0
+
+    def invalidateCache(self, reg=None):
+        if reg is not None:
+            self.cached[reg] = 0
+            return
+        for reg in range(256):
+            self.cached[reg] = 0
+
+    def syncCache(self):
+        # Reload the shadow with one burst read per contiguous range
+        shadow = memoryview(self.shadow)
+        first = None
+        for reg in range(257):
+            if reg < 256 and self.cacheable[reg]:
+                if first is None:
+                    first = reg
+            elif first is not None:
+                self.read_block(first, shadow[first:reg])
+                for i in range(first, reg):
+                    self.cached[i] = 1
+                first = None
+
+    def dump(self, buf=None):
+        # The whole 0x00..0xFF register space in 64 byte bursts. Cached
+        # registers are refreshed from it as well.
+        if buf is None:
+            buf = bytearray(256)
+        view = memoryview(buf)
+        for reg in range(0, 256, 64):
+            self.read_block(reg, view[reg:reg + 64])
+        if self.cache:
+            for reg in range(256):
+                if self.cacheable[reg]:
+                    self.shadow[reg] = buf[reg]
+                    self.cached[reg] = 1
+        return buf
+
+    def restore(self, snapshot, mask=None):
+        # Write back the registers of a dump() that differ from the chip,
+        # only writable ones and, with mask, only where mask[reg] is set.
+        # Outputs are switched like apply_profile(): off first, on last.
+        # Returns the number of registers written.
+        state = self.__unbatch()
+        try:
+            return self.__restore(snapshot, mask)
+        finally:
+            self.__rebatch(state)
+
+    def __restore(self, snapshot, mask):
+        current = self.dump()
+        changed = []
+        for first, last in self.profile.restore_ranges:
+            for reg in range(first, last + 1):
+                if (mask is None or mask[reg]) and snapshot[reg] != current[reg]:
+                    changed.append(reg)
+        written = 0
+        power = _AXP202_LDO234_DC23_CTL
+        if power in changed:
+            changed.remove(power)
+            if current[power] & ~snapshot[power]:
+                current[power] &= snapshot[power]
+                self.write_byte(power, current[power])
+                written += 1
+        self.begin()
+        try:
+            for reg in changed:
+                self.write_byte(reg, snapshot[reg])
+        except Exception:
+            self.abort()
+            raise
+        self.commit()
+        written += len(changed)
+        if current[power] != snapshot[power] and (mask is None or mask[power]):
+            self.write_byte(power, snapshot[power])
+            written += 1
+        return written
 
     def enablePower(self, ch):
-        data = self.read_byte(AXP202_LDO234_DC23_CTL)
+        data = self.read_byte(_AXP202_LDO234_DC23_CTL)
         data = data | (1 << ch)
-        self.write_byte(AXP202_LDO234_DC23_CTL, data)
+        self.write_byte(_AXP202_LDO234_DC23_CTL, data)
 
     def disablePower(self, ch):
-        data = self.read_byte(AXP202_LDO234_DC23_CTL)
+        data = self.read_byte(_AXP202_LDO234_DC23_CTL)
         data = data & (~(1 << ch))
-        self.write_byte(AXP202_LDO234_DC23_CTL, data)
+        self.write_byte(_AXP202_LDO234_DC23_CTL, data)
+
+    def apply_profile(self, profile):
+        # Bring the PMU to a PowerProfile writing only the registers that
+        # differ from the current state: outputs are switched off first,
+        # then voltages, LED and charge settings are written, outputs are
+        # switched on last so no rail comes up at its old voltage. Returns
+        # the number of registers written. Inside a batch() the pending
+        # writes go out first, the batch stays open for what follows.
+        state = self.__unbatch()
+        try:
+            return self.__apply_profile(profile)
+        finally:
+            self.__rebatch(state)
+
+    def __apply_profile(self, profile):
+        outputs = self.profile.outputs
+        fields = {}  # register: (mask, value)
+        for name, mv in profile.rails.items():
+            rail = self.rails.get(name)
+            if rail is None:
+                raise ValueError('no rail ' + name)
+            reg, mask, shift, low, high, step = rail
+            mv = min(high, max(low, int(mv)))
+            self.__set_field(fields, reg, mask, ((mv - low) // step) << shift)
+        if profile.led is not None:
+            self.__set_field(fields, _AXP202_OFF_CTL, 0x38,
+                             0x08 | (profile.led & 3) << 4)
+        if profile.charge is not None:
+            self.__set_field(fields, _AXP202_CHARGE1, 0x80,
+                             0x80 if profile.charge else 0)
+        if profile.charge_target is not None:
+            self.__set_field(fields, _AXP202_CHARGE1, 0x60,
+                             (profile.charge_target & 3) << 5)
+        if profile.charge_current is not None:
+            val = 0
+            for i, ma in enumerate(self.profile.chg_currents):
+                if ma <= profile.charge_current:
+                    val = i
+            self.__set_field(fields, _AXP202_CHARGE1, 0x0F, val)
+        on = 0
+        off = 0
+        for name in profile.on + profile.off:
+            if name not in outputs:
+                raise ValueError('no output ' + name)
+        for name in profile.on:
+            on |= 1 << outputs[name]
+        for name in profile.off:
+            off |= 1 << outputs[name]
+
+        current = self.__read_regs(sorted(fields) + [_AXP202_LDO234_DC23_CTL])
+        written = 0
+        power = current[_AXP202_LDO234_DC23_CTL]
+        if power & off:
+            power &= ~off
+            self.write_byte(_AXP202_LDO234_DC23_CTL, power)
+            written += 1
+        self.begin()
+        try:
+            for reg in sorted(fields):
+                mask, val = fields[reg]
+                val |= current[reg] & ~mask
+                if val != current[reg]:
+                    self.write_byte(reg, val)
+                    written += 1
+        except Exception:
+            self.abort()
+            raise
+        self.commit()
+        if on & ~power:
+            self.write_byte(_AXP202_LDO234_DC23_CTL, power | on)
+            written += 1
+        return written
+
+    def __set_field(self, fields, reg, mask, val):
+        old_mask, old_val = fields.get(reg, (0, 0))
+        fields[reg] = (old_mask | mask, (old_val & ~mask) | (val & mask))
+
+    def __read_regs(self, regs):
+        # Current value of each register, one burst over the whole span
+        # unless every register is already cached or pending
+        pending = self.pending if self.pending is not None else {}
+        if all(self.cached[reg] or reg in pending for reg in regs):
+            return dict((reg, self.read_byte(reg)) for reg in regs)
+        first = min(regs)
+        buf = self.read_block(first, bytearray(max(regs) - first + 1))
+        current = {}
+        for reg in regs:
+            if reg in pending:
+                current[reg] = pending[reg]
+            elif self.cached[reg]:
+                current[reg] = self.shadow[reg]
+            else:
+                current[reg] = buf[reg - first]
+        return current
 
     def __BIT_MASK(self, mask):
         return 1 << mask
 
-    def __get_h8_l5(self, regh8, regl5):
-        hv = self.read_byte(regh8)
-        lv = self.read_byte(regl5)
-        return (hv << 5) | (lv & 0x1F)
-
-    def __get_h8_l4(self, regh8, regl5):
-        hv = self.read_byte(regh8)
-        lv = self.read_byte(regl5)
-        return (hv << 4) | (lv & 0xF)
-
     def isChargeing(self):
-        data = self.read_byte(AXP202_MODE_CHGSTATUS)
+        data = self.read_byte(_AXP202_MODE_CHGSTATUS)
         return data & self.__BIT_MASK(6)
 
     def isBatteryConnect(self):
-        data = self.read_byte(AXP202_MODE_CHGSTATUS)
+        data = self.read_byte(_AXP202_MODE_CHGSTATUS)
         return data & self.__BIT_MASK(5)
 
     def getAcinCurrent(self):
-        data = self.__get_h8_l4(AXP202_ACIN_CUR_H8, AXP202_ACIN_CUR_L4)
-        return data * AXP202_ACIN_CUR_STEP
+        return self.readChannel(_ACIN_CURRENT)
 
     def getAcinVoltage(self):
-        data = self.__get_h8_l4(AXP202_ACIN_VOL_H8, AXP202_ACIN_VOL_L4)
-        return data * AXP202_ACIN_VOLTAGE_STEP
+        return self.readChannel(_ACIN_VOLTAGE)
 
     def getVbusVoltage(self):
-        data = self.__get_h8_l4(AXP202_VBUS_VOL_H8, AXP202_VBUS_VOL_L4)
-        return data * AXP202_VBUS_VOLTAGE_STEP
+        return self.readChannel(_VBUS_VOLTAGE)
 
     def getVbusCurrent(self):
-        data = self.__get_h8_l4(AXP202_VBUS_CUR_H8, AXP202_VBUS_CUR_L4)
-        return data * AXP202_VBUS_CUR_STEP
+        return self.readChannel(_VBUS_CURRENT)
 
     def getTemp(self):
-        hv = self.read_byte(AXP202_INTERNAL_TEMP_H8)
-        lv = self.read_byte(AXP202_INTERNAL_TEMP_L4)
-        data = (hv << 8) | (lv & 0xF)
-        return data / 1000
+        return self.readChannel(_TEMP)
 
     def getTSTemp(self):
-        data = self.__get_h8_l4(AXP202_TS_IN_H8, AXP202_TS_IN_L4)
-        return data * AXP202_TS_PIN_OUT_STEP
+        return self.readChannel(_TS_TEMP)
 
     def getGPIO0Voltage(self):
-        data = self.__get_h8_l4(AXP202_GPIO0_VOL_ADC_H8,
-                                AXP202_GPIO0_VOL_ADC_L4)
-        return data * AXP202_GPIO0_STEP
+        return self.readChannel(_GPIO0_VOLTAGE)
 
     def getGPIO1Voltage(self):
-        data = self.__get_h8_l4(AXP202_GPIO1_VOL_ADC_H8,
-                                AXP202_GPIO1_VOL_ADC_L4)
-        return data * AXP202_GPIO1_STEP
+        return self.readChannel(_GPIO1_VOLTAGE)
 
     def getBattInpower(self):
-        h8 = self.read_byte(AXP202_BAT_POWERH8)
-        m8 = self.read_byte(AXP202_BAT_POWERM8)
-        l8 = self.read_byte(AXP202_BAT_POWERL8)
-        data = (h8 << 16) | (m8 << 8) | l8
-        return 2 * data * 1.1 * 0.5 / 1000
+        return self.readChannel(_BATT_INPOWER)
 
     def getBattVoltage(self):
-        data = self.__get_h8_l4(AXP202_BAT_AVERVOL_H8, AXP202_BAT_AVERVOL_L4)
-        return data * AXP202_BATT_VOLTAGE_STEP
+        return self.readChannel(_BATT_VOLTAGE)
 
     def getBattChargeCurrent(self):
-        data = 0
-        if(self.chip == AXP202_CHIP_ID):
-            data = self.__get_h8_l4(
-                AXP202_BAT_AVERCHGCUR_H8, AXP202_BAT_AVERCHGCUR_L4) * AXP202_BATT_CHARGE_CUR_STEP
-        elif (self.chip == AXP192_CHIP_ID):
-            data = self.__get_h8_l5(
-                AXP202_BAT_AVERCHGCUR_H8, AXP202_BAT_AVERCHGCUR_L4) * AXP202_BATT_CHARGE_CUR_STEP
-        return data
+        return self.readChannel(_BATT_CHARGE_CURRENT)
 
     def getBattDischargeCurrent(self):
-        data = self.__get_h8_l4(
-            AXP202_BAT_AVERDISCHGCUR_H8, AXP202_BAT_AVERDISCHGCUR_L5) * AXP202_BATT_DISCHARGE_CUR_STEP
-        return data
+        return self.readChannel(_BATT_DISCHARGE_CURRENT)
 
     def getSysIPSOUTVoltage(self):
-        hv = self.read_byte(AXP202_APS_AVERVOL_H8)
-        lv = self.read_byte(AXP202_APS_AVERVOL_L4)
-        data = (hv << 4) | (lv & 0xF)
-        return data
+        return self.readChannel(_APS_VOLTAGE)
+
+    def __load_range(self):
+        self.__set_range(self.read_byte(_AXP202_ADC_INPUTRANGE))
+
+    def __set_range(self, data):
+        # the 0.7V..2.7475V GPIO input range reads 0 at 700mV
+        self.adc_range = data
+        for ch, bit in ((_GPIO0_VOLTAGE, 1), (_GPIO1_VOLTAGE, 2)):
+            offset = 700 if data & bit else 0
+            self.adc_offset[ch] = offset
+            self.adc_ioffset[ch] = offset
+
+    def decodeRaw(self, ch, buf, i):
+        width = self.adc_width[ch]
+        if width == 24:
+            return (buf[i] << 16) | (buf[i + 1] << 8) | buf[i + 2]
+        low = width - 8
+        return (buf[i] << low) | (buf[i + 1] & ((1 << low) - 1))
+
+    def readChannel(self, ch):
+        # one burst for a single channel
+        if self.adc_range is None and (ch == _GPIO0_VOLTAGE or ch == _GPIO1_VOLTAGE):
+            self.__load_range()
+        buf = self.read_block(ADC_CHANNELS[ch][1], self.chanviews[ch])
+        return self.convert(ch, self.decodeRaw(ch, buf, 0))
+
+    def convert(self, ch, raw):
+        if self.integer:
+            return raw * self.adc_num[ch] // self.adc_den[ch] + self.adc_ioffset[ch]
+        return raw * self.adc_scale[ch] + self.adc_offset[ch]
+
+    def setIntegerMode(self, en):
+        # Integer mode returns mV, mA, uW and 0.1 degC as ints, which
+        # avoids a heap float per reading on MicroPython
+        self.integer = bool(en)
+        self.last_snapshot = None
+
+    def select(self, *names):
+        # prepare a channel set for readChannels(), e.g.
+        # pmu.select('vbus_voltage', 'vbus_current', 'batt_voltage')
+        return _Selection(self, names)
+
+    def decode(self, sel, buf=None):
+        # convert every channel of a selection from its register buffer
+        if buf is None:
+            buf = sel.buf
+        values = []
+        for n in range(len(sel.channels)):
+            ch = sel.channels[n]
+            values.append(self.convert(ch, self.decodeRaw(ch, buf, sel.offsets[n])))
+        return values
+
+    def readChannels(self, sel):
+        if self.adc_range is None and sel.gpio:
+            self.__load_range()
+        self.read_block(sel.first, sel.buf)
+        return Reading(sel.names, self.decode(sel))
+
+    def readInto(self, sel, arr, start=0):
+        # Fill arr[start:] with integer readings of a selection, without
+        # allocating: arr = array('i', bytes(4 * len(names)))
+        if self.adc_range is None and sel.gpio:
+            self.__load_range()
+        buf = self.read_block(sel.first, sel.buf)
+        channels = sel.channels
+        offsets = sel.offsets
+        num = self.adc_num
+        den = self.adc_den
+        ioffset = self.adc_ioffset
+        for n in range(len(channels)):
+            ch = channels[n]
+            arr[start + n] = self.decodeRaw(ch, buf, offsets[n]) * num[ch] // den[ch] + ioffset[ch]
+        return arr
+
+    def snapshot(self):
+        # Read every ADC channel with two bus transactions: the whole
+        # 0x56..0x7F block in one burst plus the fuel gauge percentage.
+        # Values are decoded like the individual getters. Calls
+        # faster than the ADC sampling rate return the previous result.
+        if self.adc_rate is None:
+            self.getAdcSamplingRate()
+        now = time.ticks_us()
+        if self.last_snapshot is not None and \
+                time.ticks_diff(now, self.adc_stamp) < 1000000 // self.adc_rate:
+            return self.last_snapshot
+        self.adc_stamp = now
+        sel = self.all_channels
+        if self.adc_range is None:
+            self.__load_range()
+        self.read_block(sel.first, sel.buf)
+        values = self.decode(sel)
+        pct = self.read_byte(_AXP202_BATT_PERCENTAGE)
+        values.append(0 if pct & 0x80 else pct)
+        self.last_snapshot = Reading(self.snapshot_names, values)
+        return self.last_snapshot
 
     def enableADC(self, ch, val):
         if(ch == 1):
-            data = self.read_byte(AXP202_ADC_EN1)
+            data = self.read_byte(_AXP202_ADC_EN1)
             data = data | (1 << val)
-            self.write_byte(AXP202_ADC_EN1, data)
+            self.write_byte(_AXP202_ADC_EN1, data)
         elif(ch == 2):
-            data = self.read_byte(AXP202_ADC_EN2)
+            data = self.read_byte(_AXP202_ADC_EN2)
             data = data | (1 << val)
-            self.write_byte(AXP202_ADC_EN1, data)
+            self.write_byte(_AXP202_ADC_EN1, data)
         else:
             return
 
     def disableADC(self, ch, val):
         if(ch == 1):
-            data = self.read_byte(AXP202_ADC_EN1)
+            data = self.read_byte(_AXP202_ADC_EN1)
             data = data & (~(1 << val))
-            self.write_byte(AXP202_ADC_EN1, data)
+            self.write_byte(_AXP202_ADC_EN1, data)
         elif(ch == 2):
-            data = self.read_byte(AXP202_ADC_EN2)
+            data = self.read_byte(_AXP202_ADC_EN2)
             data = data & (~(1 << val))
-            self.write_byte(AXP202_ADC_EN1, data)
+            self.write_byte(_AXP202_ADC_EN1, data)
         else:
             return
 
     def enableIRQ(self, val):
-        if(val & 0xFF):
-            data = self.read_byte(AXP202_INTEN1)
-            data = data | (val & 0xFF)
-            self.write_byte(AXP202_INTEN1, data)
-
-        if(val & 0xFF00):
-            data = self.read_byte(AXP202_INTEN2)
-            data = data | (val >> 8)
-            self.write_byte(AXP202_INTEN2, data)
-
-        if(val & 0xFF0000):
-            data = self.read_byte(AXP202_INTEN3)
-            data = data | (val >> 16)
-            self.write_byte(AXP202_INTEN3, data)
-
-        if(val & 0xFF000000):
-            data = self.read_byte(AXP202_INTEN4)
-            data = data | (val >> 24)
-            self.write_byte(AXP202_INTEN4, data)
+        with self.batch():
+            for i, reg in enumerate(self.profile.irq_enable):
+                bits = (val >> (8 * i)) & 0xFF
+                if(bits):
+                    data = self.read_byte(reg)
+                    self.write_byte(reg, data | bits)
 
     def disableIRQ(self, val):
-        if(val & 0xFF):
-            data = self.read_byte(AXP202_INTEN1)
-            data = data & (~(val & 0xFF))
-            self.write_byte(AXP202_INTEN1, data)
-
-        if(val & 0xFF00):
-            data = self.read_byte(AXP202_INTEN2)
-            data = data & (~(val >> 8))
-            self.write_byte(AXP202_INTEN2, data)
-
-        if(val & 0xFF0000):
-            data = self.read_byte(AXP202_INTEN3)
-            data = data & (~(val >> 16))
-            self.write_byte(AXP202_INTEN3, data)
-
-        if(val & 0xFF000000):
-            data = self.read_byte(AXP202_INTEN4)
-            data = data & (~(val >> 24))
-            self.write_byte(AXP202_INTEN4, data)
-        pass
+        with self.batch():
+            for i, reg in enumerate(self.profile.irq_enable):
+                bits = (val >> (8 * i)) & 0xFF
+                if(bits):
+                    data = self.read_byte(reg)
+                    self.write_byte(reg, data & (~bits))
 
     def readIRQ(self):
-        if(self.chip == AXP202_CHIP_ID):
-            for i in range(5):
-                self.irqbuf[i] = self.read_byte(AXP202_INTSTS1 + i)
-        elif(self.chip == AXP192_CHIP_ID):
-            for i in range(4):
-                self.irqbuf[i] = self.read_byte(AXP192_INTSTS1 + i)
-
-            self.irqbuf[4] = self.read_byte(AXP192_INTSTS5)
+        for reg, buf, clr, ack in self.irq_runs:
+            self.read_block(reg, buf)
 
     def clearIRQ(self):
-        if(self.chip == AXP202_CHIP_ID):
-            for i in range(5):
-                self.write_byte(AXP202_INTSTS1 + i, 0xFF)
-                self.irqbuf[i] = 0
-        elif(self.chip == AXP192_CHIP_ID):
-            for i in range(4):
-                self.write_byte(AXP192_INTSTS1 + i, 0xFF)
-            self.write_byte(AXP192_INTSTS5, 0xFF)
+        for reg, buf, clr, ack in self.irq_runs:
+            self.bus.writeto_mem(self.address, reg, clr)
+        for i in range(5):
+            self.irqbuf[i] = 0
+
+    def ackIRQ(self):
+        # Write-1-to-clear only the status bits seen by the last readIRQ()
+        for reg, buf, clr, ack in self.irq_runs:
+            for i in range(len(buf)):
+                ack[2 * i] = buf[i]
+            self.bus.writeto_mem(self.address, reg, ack)
+
+    def getIRQStatus(self):
+        buf = self.irqbuf
+        return buf[0] | (buf[1] << 8) | (buf[2] << 16) | \
+            (buf[3] << 24) | (buf[4] << 32)
+
+    def onIRQ(self, mask, callback, enable=True):
+        # callback(pmu, events) is called with the subset of mask that fired
+        self.irq_handlers.append((mask, callback))
+        if enable:
+            self.enableIRQ(mask)
+
+    def removeIRQ(self, callback):
+        self.irq_handlers = [h for h in self.irq_handlers if h[1] != callback]
+
+    def attachIRQ(self):
+        self.pin_intr.irq(trigger=Pin.IRQ_FALLING, handler=self.__pin_handler)
+
+    def detachIRQ(self):
+        self.pin_intr.irq(handler=None)
+
+    def __pin_handler(self, pin):
+        # hard IRQ context: no bus access and no allocation, defer the work
+        try:
+            micropython.schedule(self.service_cb, None)
+        except RuntimeError:
+            # schedule queue full, the next edge or poll picks it up
+            pass
+
+    def serviceIRQ(self, arg=None):
+        # Read, acknowledge and dispatch pending events. Repeats while the
+        # line stays asserted so events raised during dispatch are not lost.
+        lock = self.bus_lock
+        if lock is not None:
+            if lock.held():
+                lock.deferred = True
+                return 0
+            lock.acquire()
+        try:
+            return self.__service()
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def __service(self):
+        events = 0
+        for _ in range(4):
+            self.readIRQ()
+            status = self.getIRQStatus()
+            if not status:
+                break
+            self.ackIRQ()
+            events |= status
+            for mask, callback in self.irq_handlers:
+                if status & mask:
+                    callback(self, status & mask)
+            if self.pin_intr.value():
+                break
+        return events
 
     def isVBUSPlug(self):
-        data = self.read_byte(AXP202_STATUS)
+        data = self.read_byte(_AXP202_STATUS)
         return data & self.__BIT_MASK(5)
 
+    def __set_rail(self, rail, mv):
+        reg, mask, shift, low, high, step = rail
+        if(mv < low):
+            mv = low
+        elif(mv > high):
+            mv = high
+        val = ((int(mv) - low) // step) << shift
+        if mask != 0xFF:
+            val |= self.read_byte(reg) & ~mask
+        self.write_byte(reg, val)
+
     # Only can set axp192
     def setDC1Voltage(self, mv):
-        if(self.chip != AXP192_CHIP_ID):
-            return
-        if(mv < 700):
-            mv = 700
-        elif(mv > 3500):
-            mv = 3500
-        val = (mv - 700) / 25
-        self.write_byte(AXP192_DC1_VLOTAGE, int(val))
+        rail = self.rails.get('dc1')
+        if rail is not None:
+            self.__set_rail(rail, mv)
 
     def setDC2Voltage(self, mv):
-        if(mv < 700):
-            mv = 700
-        elif(mv > 2275):
-            mv = 2275
-        val = (mv - 700) / 25
-        self.write_byte(AXP202_DC2OUT_VOL, int(val))
+        self.__set_rail(self.rails['dc2'], mv)
 
     def setDC3Voltage(self, mv):
-        if(mv < 700):
-            mv = 700
-        elif(mv > 3500):
-            mv = 3500
-        val = (mv - 700) / 25
-        self.write_byte(AXP202_DC3OUT_VOL, int(val))
+        self.__set_rail(self.rails['dc3'], mv)
 
     def setLDO2Voltage(self, mv):
-        if(mv < 1800):
-            mv = 1800
-        elif(mv > 3300):
-            mv = 3300
-        val = (mv - 1800) / 100
-        prev = self.read_byte(AXP202_LDO24OUT_VOL)
-        prev &= 0x0F
-        prev = prev | (int(val) << 4)
-        self.write_byte(AXP202_LDO24OUT_VOL, int(prev))
+        self.__set_rail(self.rails['ldo2'], mv)
 
     def setLDO3Voltage(self, mv):
-        if self.chip == AXP202_CHIP_ID and mv < 700:
-            mv = 700
-        elif self.chip == AXP192_CHIP_ID and mv < 1800:
-            mv = 1800
-
-        if self.chip == AXP202_CHIP_ID and mv > 3500:
-            mv = 3500
-        elif self.chip == AXP192_CHIP_ID and mv > 3300:
-            mv = 3300
-
-        if self.chip == AXP202_CHIP_ID:
-            val = (mv - 700) / 25
-            prev = self.read_byte(AXP202_LDO3OUT_VOL)
-            prev &= 0x80
-            prev = prev | int(val)
-            self.write_byte(AXP202_LDO3OUT_VOL, int(prev))
-            # self.write_byte(AXP202_LDO3OUT_VOL, int(val))
-        elif self.chip == AXP192_CHIP_ID:
-            val = (mv - 1800) / 100
-            prev = self.read_byte(AXP192_LDO23OUT_VOL)
-            prev &= 0xF0
-            prev = prev | int(val)
-            self.write_byte(AXP192_LDO23OUT_VOL, int(prev))
+        self.__set_rail(self.rails['ldo3'], mv)
 
     def setLDO4Voltage(self, arg):
-        if self.chip == AXP202_CHIP_ID and arg <= AXP202_LDO4_3300MV:
-            data = self.read_byte(AXP202_LDO24OUT_VOL)
+        if self.profile.has_ldo4 and arg <= _AXP202_LDO4_3300MV:
+            data = self.read_byte(_AXP202_LDO24OUT_VOL)
             data = data & 0xF0
             data = data | arg
-            self.write_byte(AXP202_LDO24OUT_VOL, data)
+            self.write_byte(_AXP202_LDO24OUT_VOL, data)
 
     def setLDO3Mode(self, mode):
-        if(mode > AXP202_LDO3_DCIN_MODE):
+        if(mode > _AXP202_LDO3_DCIN_MODE):
             return
-        data = self.read_byte(AXP202_LDO3OUT_VOL)
+        data = self.read_byte(_AXP202_LDO3OUT_VOL)
         if(mode):
             data = data | self.__BIT_MASK(7)
         else:
             data = data & (~self.__BIT_MASK(7))
-        self.write_byte(AXP202_LDO3OUT_VOL, data)
+        self.write_byte(_AXP202_LDO3OUT_VOL, data)
 
     def setStartupTime(self, val):
         startupParams = (
@@ -374,12 +1252,12 @@ class PMU(object):
             0b01000000,
             0b10000000,
             0b11000000)
-        if(val > AXP202_STARTUP_TIME_2S):
+        if(val > _AXP202_STARTUP_TIME_2S):
             return
-        data = self.read_byte(AXP202_POK_SET)
+        data = self.read_byte(_AXP202_POK_SET)
         data = data & (~startupParams[3])
         data = data | startupParams[val]
-        self.write_byte(AXP202_POK_SET, data)
+        self.write_byte(_AXP202_POK_SET, data)
 
     def setlongPressTime(self, val):
         longPressParams = (
@@ -387,12 +1265,12 @@ class PMU(object):
             0b00010000,
             0b00100000,
             0b00110000)
-        if(val > AXP202_LONGPRESS_TIME_2S5):
+        if(val > _AXP202_LONGPRESS_TIME_2S5):
             return
-        data = self.read_byte(AXP202_POK_SET)
+        data = self.read_byte(_AXP202_POK_SET)
         data = data & (~longPressParams[3])
         data = data | longPressParams[val]
-        self.write_byte(AXP202_POK_SET, data)
+        self.write_byte(_AXP202_POK_SET, data)
 
     def setShutdownTime(self, val):
         shutdownParams = (
@@ -400,42 +1278,40 @@ class PMU(object):
             0b00000001,
             0b00000010,
             0b00000011)
-        if(val > AXP202_SHUTDOWN_TIME_10S):
+        if(val > _AXP202_SHUTDOWN_TIME_10S):
             return
-        data = self.read_byte(AXP202_POK_SET)
+        data = self.read_byte(_AXP202_POK_SET)
         data = data & (~shutdownParams[3])
         data = data | shutdownParams[val]
-        self.write_byte(AXP202_POK_SET, data)
+        self.write_byte(_AXP202_POK_SET, data)
 
     def setTimeOutShutdown(self, en):
-        data = self.read_byte(AXP202_POK_SET)
+        data = self.read_byte(_AXP202_POK_SET)
         if(en):
             data = data | self.__BIT_MASK(3)
         else:
             data = data | (~self.__BIT_MASK(3))
-        self.write_byte(AXP202_POK_SET, data)
+        self.write_byte(_AXP202_POK_SET, data)
 
     def shutdown(self):
-        data = self.read_byte(AXP202_OFF_CTL)
+        data = self.read_byte(_AXP202_OFF_CTL)
         data = data | self.__BIT_MASK(7)
-        self.write_byte(AXP202_OFF_CTL, data)
+        self.write_byte(_AXP202_OFF_CTL, data)
 
     def getSettingChargeCurrent(self):
-        data = self.read_byte(AXP202_CHARGE1)
-        data = data & 0b00000111
-        curr = 300 + data * 100
-        return curr
+        data = self.read_byte(_AXP202_CHARGE1)
+        return self.profile.chg_currents[data & 0x0F]
 
     def isChargeingEnable(self):
-        data = self.read_byte(AXP202_CHARGE1)
+        data = self.read_byte(_AXP202_CHARGE1)
         if(data & self.__BIT_MASK(7)):
             return True
         return False
 
     def enableChargeing(self):
-        data = self.read_byte(AXP202_CHARGE1)
+        data = self.read_byte(_AXP202_CHARGE1)
         data = data | self.__BIT_MASK(7)
-        self.write_byte(AXP202_CHARGE1, data)
+        self.write_byte(_AXP202_CHARGE1, data)
 
     def setChargingTargetVoltage(self, val):
         targetVolParams = (
@@ -443,37 +1319,194 @@ class PMU(object):
             0b00100000,
             0b01000000,
             0b01100000)
-        if(val > AXP202_TARGET_VOL_4_36V):
+        if(val > _AXP202_TARGET_VOL_4_36V):
             return
-        data = self.read_byte(AXP202_CHARGE1)
+        data = self.read_byte(_AXP202_CHARGE1)
         data = data & (~targetVolParams[3])
         data = data | targetVolParams[val]
-        self.write_byte(AXP202_CHARGE1, data)
+        self.write_byte(_AXP202_CHARGE1, data)
 
     def getBattPercentage(self):
-        data = self.read_byte(AXP202_BATT_PERCENTAGE)
+        data = self.read_byte(_AXP202_BATT_PERCENTAGE)
         mask = data & self.__BIT_MASK(7)
         if(mask):
             return 0
         return data & (~self.__BIT_MASK(7))
 
+    def getAdcSamplingRate(self):
+        data = self.read_byte(_AXP202_ADC_SPEED)
+        self.adc_rate = 25 << ((data & 0xC0) >> 6)
+        return self.adc_rate
+
+    def setAdcSamplingRate(self, rate):
+        if(rate > _AXP_ADC_SAMPLING_RATE_200HZ):
+            return
+        data = self.read_byte(_AXP202_ADC_SPEED)
+        data = (data & 0x3F) | (rate << 6)
+        self.write_byte(_AXP202_ADC_SPEED, data)
+        self.adc_rate = 25 << rate
+        self.last_snapshot = None
+
+    def setTSCurrent(self, current):
+        if(current > _AXP_TS_PIN_CURRENT_80UA):
+            return
+        data = self.read_byte(_AXP202_ADC_SPEED)
+        data = (data & 0xCF) | (current << 4)
+        self.write_byte(_AXP202_ADC_SPEED, data)
+
+    def setTSFunction(self, func):
+        if(func > _AXP_TS_PIN_FUNCTION_ADC):
+            return
+        data = self.read_byte(_AXP202_ADC_SPEED)
+        data = (data & 0xFB) | (func << 2)
+        self.write_byte(_AXP202_ADC_SPEED, data)
+
+    def setTSMode(self, mode):
+        if(mode > _AXP_TS_PIN_MODE_ENABLE):
+            return
+        data = self.read_byte(_AXP202_ADC_SPEED)
+        data = (data & 0xFC) | mode
+        self.write_byte(_AXP202_ADC_SPEED, data)
+
+    def setVWarningLevel1(self, mv):
+        # APS low voltage warning, Vwarning = 2.8672V + N * 5.6mV
+        self.write_byte(_AXP202_APS_WARNING1, self.__aps_level(mv))
+
+    def setVWarningLevel2(self, mv):
+        self.write_byte(_AXP202_APS_WARNING2, self.__aps_level(mv))
+
+    def getVWarningLevel1(self):
+        return 2867 + self.read_byte(_AXP202_APS_WARNING1) * 28 // 5
+
+    def getVWarningLevel2(self):
+        return 2867 + self.read_byte(_AXP202_APS_WARNING2) * 28 // 5
+
+    def __aps_level(self, mv):
+        return min(255, max(0, (mv - 2867) * 5 // 28))
+
+    def setChargeTempWindow(self, low_mv, high_mv):
+        # TS pin voltages outside which charging stops, N * 12.8mV. An NTC
+        # reads a higher voltage when cold, so low_mv is the cold limit.
+        with self.batch():
+            self.write_byte(_AXP202_VLTF_CHGSET, self.__ts_level(low_mv))
+            self.write_byte(_AXP202_VHTF_CHGSET, self.__ts_level(high_mv))
+
+    def setDischargeTempWindow(self, low_mv, high_mv):
+        with self.batch():
+            self.write_byte(_AXP202_TLTF_DISCHGSET, self.__ts_level(low_mv))
+            self.write_byte(_AXP202_THTF_DISCHGSET, self.__ts_level(high_mv))
+
+    def __ts_level(self, mv):
+        return min(255, max(0, mv * 10 // 128))
+
+    def ntcVoltage(self, celsius, r25=10000, beta=3950):
+        # TS pin voltage in mV of an NTC thermistor at celsius, driven by
+        # the TS current programmed with setTSCurrent()
+        ua = 20 * (((self.read_byte(_AXP202_ADC_SPEED) >> 4) & 3) + 1)
+        r = r25 * math.exp(beta * (1 / (celsius + 273.15) - 1 / 298.15))
+        return int(r * ua / 1000)
+
+    def onLowBattery(self, level1_mv, callback, level2_mv=None):
+        # Let the PMU watch the APS voltage: callback(pmu, events) runs when
+        # it falls below level1_mv (warning) or level2_mv (critical). The
+        # AXP192 has a single level, raised as AXP202_APS_LOW_VOL_LEVEL2_IRQ.
+        with self.batch():
+            self.setVWarningLevel1(level1_mv)
+            if self.profile.aps_levels == 1:
+                mask = _AXP202_APS_LOW_VOL_LEVEL2_IRQ
+            else:
+                mask = _APX202_APS_LOW_VOL_LEVEL1_IRQ
+                if level2_mv is not None:
+                    self.setVWarningLevel2(level2_mv)
+                    mask |= _AXP202_APS_LOW_VOL_LEVEL2_IRQ
+        self.onIRQ(mask, callback)
+
+    def onBattTemp(self, low_c, high_c, callback, r25=10000, beta=3950):
+        # Program the charge and discharge temperature windows for an NTC on
+        # the TS pin, callback(pmu, events) runs when the battery leaves them
+        with self.batch():
+            self.setTSFunction(_AXP_TS_PIN_FUNCTION_BATT)
+            low_mv = self.ntcVoltage(low_c, r25, beta)
+            high_mv = self.ntcVoltage(high_c, r25, beta)
+            self.setChargeTempWindow(low_mv, high_mv)
+            self.setDischargeTempWindow(low_mv, high_mv)
+        self.onIRQ(_AXP202_BATT_LOW_TEMP_IRQ | _AXP202_BATT_OVER_TEMP_IRQ, callback)
+
+    def setGPIOAdcRange(self, gpio, rng):
+        if(gpio > 1 or rng > _AXP_GPIO_ADC_RANGE_0V7_2V7):
+            return
+        data = self.read_byte(_AXP202_ADC_INPUTRANGE)
+        data = (data & ~(1 << gpio)) | (rng << gpio)
+        self.write_byte(_AXP202_ADC_INPUTRANGE, data)
+        self.__set_range(data)
+        self.last_snapshot = None
+
+    def setTimer(self, minutes):
+        # Start the PMU timer, 1..127 minutes. Writing bit 7 clears a
+        # previous timeout, profile.timer_irq fires on expiry.
+        if(minutes < 1 or minutes > 0x7F):
+            return
+        self.write_byte(_AXP202_TIMER_CTL, 0x80 | minutes)
+
+    def offTimer(self):
+        self.write_byte(_AXP202_TIMER_CTL, 0x80)
+
+    def clearTimerStatus(self):
+        data = self.read_byte(_AXP202_TIMER_CTL)
+        self.write_byte(_AXP202_TIMER_CTL, data | 0x80)
+
+    def getTimerStatus(self):
+        return self.read_byte(_AXP202_TIMER_CTL) & 0x80
+
+    def enableCoulombcounter(self):
+        self.write_byte(_AXP202_COULOMB_CTL, 0x80)
+
+    def disableCoulombcounter(self):
+        self.write_byte(_AXP202_COULOMB_CTL, 0x00)
+
+    def stopCoulombcounter(self):
+        # keep the counter enabled but pause accumulation
+        self.write_byte(_AXP202_COULOMB_CTL, 0xC0)
+
+    def clearCoulombcounter(self):
+        self.write_byte(_AXP202_COULOMB_CTL, 0xA0)
+
+    def readCoulomb(self):
+        # charge and discharge counters, 0xB0..0xB7, in one burst
+        self.read_block(_AXP202_BAT_CHGCOULOMB3, self.coulombbuf)
+        return unpack('>II', self.coulombbuf)
+
+    def getBattChargeCoulomb(self):
+        return self.readCoulomb()[0]
+
+    def getBattDischargeCoulomb(self):
+        return self.readCoulomb()[1]
+
+    def getCoulombData(self):
+        # net charge in mAh since the counter was cleared, an int in
+        # integer mode
+        charge, discharge = self.readCoulomb()
+        if self.integer:
+            return 32768 * (charge - discharge) // (3600 * self.getAdcSamplingRate())
+        return 65536 * 0.5 * (charge - discharge) / 3600.0 / self.getAdcSamplingRate()
+
     def setChgLEDChgControl(self):
-        data = self.read_byte(AXP202_OFF_CTL)
+        data = self.read_byte(_AXP202_OFF_CTL)
         data = data & 0b111110111
-        self.write_byte(AXP202_OFF_CTL, data)
+        self.write_byte(_AXP202_OFF_CTL, data)
 
     def setChgLEDMode(self, mode):
-        data = self.read_byte(AXP202_OFF_CTL)
+        data = self.read_byte(_AXP202_OFF_CTL)
         data |= self.__BIT_MASK(3)
-        if(mode == AXP20X_LED_OFF):
+        if(mode == _AXP20X_LED_OFF):
             data = data & 0b11001111
-        elif(mode == AXP20X_LED_BLINK_1HZ):
+        elif(mode == _AXP20X_LED_BLINK_1HZ):
             data = data & 0b11001111
             data = data | 0b00010000
-        elif(mode == AXP20X_LED_BLINK_4HZ):
+        elif(mode == _AXP20X_LED_BLINK_4HZ):
             data = data & 0b11001111
             data = data | 0b00100000
-        elif(mode == AXP20X_LED_LOW_LEVEL):
+        elif(mode == _AXP20X_LED_LOW_LEVEL):
             data = data & 0b11001111
             data = data | 0b00110000
-        self.write_byte(AXP202_OFF_CTL, data)
+        self.write_byte(_AXP202_OFF_CTL, data)
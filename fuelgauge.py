@@ -0,0 +1,128 @@
+'''
+MIT License
+
+Copyright (c) 2019 lewis he
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+fuelgauge.py - Coulomb counter based fuel gauge for AXP202/AXP192.
+'''
+
+# Resting open-circuit voltage (mV) to state of charge (%) for a 1S LiPo
+OCV_TABLE = (
+    (3300, 0),
+    (3600, 5),
+    (3700, 15),
+    (3750, 30),
+    (3800, 45),
+    (3870, 60),
+    (3950, 72),
+    (4050, 85),
+    (4150, 100),
+)
+
+
+def ocv_to_soc(mv, table=OCV_TABLE):
+    if mv <= table[0][0]:
+        return table[0][1]
+    for i in range(1, len(table)):
+        v1, s1 = table[i]
+        if mv < v1:
+            v0, s0 = table[i - 1]
+            return s0 + (s1 - s0) * (mv - v0) / (v1 - v0)
+    return table[-1][1]
+
+
+class FuelGauge(object):
+    # Each update costs two bus transactions: the 8 byte coulomb counter
+    # burst and a 6 byte burst of battery voltage, charge and discharge
+    # current (0x78..0x7D). State is a handful of numbers, independent of
+    # how long the gauge runs.
+
+    def __init__(self, pmu, capacity, rest_current=50,
+                 rest_weight=0.2, load_weight=0.005):
+        self.pmu = pmu
+        self.capacity = capacity
+        self.rest_current = rest_current
+        self.rest_weight = rest_weight
+        self.load_weight = load_weight
+        self.sel = pmu.select('batt_voltage', 'batt_charge_current',
+                              'batt_discharge_current')
+        self.soc = 0
+        self.voltage = 0
+        self.current = 0
+        self.last_charge = 0
+        self.last_discharge = 0
+        self.lsb_mah = 0
+        self.reset()
+
+    def reset(self, soc=None):
+        # Restart counting, seeding the estimate from the battery voltage
+        # unless a known state of charge is given
+        pmu = self.pmu
+        pmu.clearCoulombcounter()
+        pmu.enableCoulombcounter()
+        self.lsb_mah = self.__lsb_mah()
+        self.last_charge, self.last_discharge = pmu.readCoulomb()
+        self.__read_battery()
+        self.soc = ocv_to_soc(self.voltage) if soc is None else soc
+
+    def __lsb_mah(self):
+        # The counters advance once per ADC sample, so their LSB follows
+        # the sampling rate. The PMU keeps it as adc_rate once read or set,
+        # a later setAdcSamplingRate() rescales the next update.
+        rate = self.pmu.adc_rate
+        if rate is None:
+            rate = self.pmu.getAdcSamplingRate()
+        return 65536 * 0.5 / 3600.0 / rate
+
+    def __read_battery(self):
+        r = self.pmu.readChannels(self.sel)
+        self.voltage = r[0]
+        self.current = r[1] - r[2]
+
+    def update(self):
+        charge, discharge = self.pmu.readCoulomb()
+        dc = (charge - self.last_charge) & 0xFFFFFFFF
+        dd = (discharge - self.last_discharge) & 0xFFFFFFFF
+        self.last_charge = charge
+        self.last_discharge = discharge
+        self.__read_battery()
+        self.lsb_mah = self.__lsb_mah()
+
+        soc = self.soc + (dc - dd) * self.lsb_mah * 100 / self.capacity
+        # The terminal voltage only tracks the OCV curve near rest, so
+        # trust it more when little current flows
+        if abs(self.current) < self.rest_current:
+            weight = self.rest_weight
+        else:
+            weight = self.load_weight
+        soc += weight * (ocv_to_soc(self.voltage) - soc)
+        self.soc = min(100, max(0, soc))
+        return self.soc
+
+    def remaining(self):
+        # remaining capacity in mAh
+        return self.capacity * self.soc / 100
+
+    def timeToEmpty(self):
+        # hours left at the present discharge rate, None while charging
+        if self.current >= 0:
+            return None
+        return self.remaining() / -self.current
@@ -0,0 +1,291 @@
+'''
+Register-map emulator of the X-Power AXP202 and AXP192 for host testing.
+
+    import machine
+    from axpemu import AXPEmulator, sine
+    emu = AXPEmulator()                  # AXP202 at 0x35, IRQ on pin 35
+    emu.drive('vbus_voltage', 5000)      # mV
+    emu.drive('batt_discharge_current', sine(120, 80, 2.0))
+    pmu = axp202.PMU()
+    emu.step(0.5)                        # advance emulated time
+
+ADC registers follow the driven waveforms at the emulated time, IRQ status
+registers are write-1-to-clear and pull the interrupt pin low while an
+enabled event is pending, the coulomb counters integrate the battery
+current and the PMU timer counts down in emulated minutes. Multi-byte
+writes are register/data pairs as on the chip, only reads auto-increment.
+step() also raises the APS low voltage and battery temperature IRQs when a
+driven waveform crosses the programmed warning levels or TS window.
+'''
+import math
+
+import machine
+from constants import *
+
+# name: (H8 register, bits in the low register, step, offset)
+ADC_CHANNELS = {
+    'acin_voltage': (AXP202_ACIN_VOL_H8, 4, AXP202_ACIN_VOLTAGE_STEP, 0),
+    'acin_current': (AXP202_ACIN_CUR_H8, 4, AXP202_ACIN_CUR_STEP, 0),
+    'vbus_voltage': (AXP202_VBUS_VOL_H8, 4, AXP202_VBUS_VOLTAGE_STEP, 0),
+    'vbus_current': (AXP202_VBUS_CUR_H8, 4, AXP202_VBUS_CUR_STEP, 0),
+    'temp': (AXP202_INTERNAL_TEMP_H8, 4, AXP202_INTENAL_TEMP_STEP, -144.7),
+    'ts_voltage': (AXP202_TS_IN_H8, 4, AXP202_TS_PIN_OUT_STEP, 0),
+    'gpio0_voltage': (AXP202_GPIO0_VOL_ADC_H8, 4, AXP202_GPIO0_STEP, 0),
+    'gpio1_voltage': (AXP202_GPIO1_VOL_ADC_H8, 4, AXP202_GPIO1_STEP, 0),
+    'batt_voltage': (AXP202_BAT_AVERVOL_H8, 4, AXP202_BATT_VOLTAGE_STEP, 0),
+    'batt_charge_current': (AXP202_BAT_AVERCHGCUR_H8, 4, AXP202_BATT_CHARGE_CUR_STEP, 0),
+    'batt_discharge_current': (AXP202_BAT_AVERDISCHGCUR_H8, 5, AXP202_BATT_DISCHARGE_CUR_STEP, 0),
+    'aps_voltage': (AXP202_APS_AVERVOL_H8, 4, AXP202_APS_VOLTAGE_STEP, 0),
+}
+
+# power-on values of the registers the driver touches
+_RESET_AXP202 = {
+    AXP202_LDO234_DC23_CTL: 0x51,
+    AXP202_DC2OUT_VOL: 0x16,
+    AXP202_DC3OUT_VOL: 0x68,
+    AXP202_LDO24OUT_VOL: 0xCF,
+    AXP202_LDO3OUT_VOL: 0x00,
+    AXP202_OFF_CTL: 0x46,
+    AXP202_CHARGE1: 0xC8,
+    AXP202_POK_SET: 0x5D,
+    AXP202_VLTF_CHGSET: 0xA5,
+    AXP202_VHTF_CHGSET: 0x1F,
+    AXP202_APS_WARNING1: 0x68,
+    AXP202_APS_WARNING2: 0x5F,
+    AXP202_TLTF_DISCHGSET: 0xFC,
+    AXP202_THTF_DISCHGSET: 0x16,
+    AXP202_INTEN1: 0xD8,
+    AXP202_INTEN2: 0xFF,
+    AXP202_INTEN3: 0x3B,
+    AXP202_INTEN4: 0xC1,
+    AXP202_ADC_EN1: 0x83,
+    AXP202_ADC_EN2: 0x80,
+    AXP202_ADC_SPEED: 0x32,
+}
+
+_RESET_AXP192 = {
+    AXP202_LDO234_DC23_CTL: 0x4D,
+    AXP192_DC1_VLOTAGE: 0x68,
+    AXP202_DC3OUT_VOL: 0x68,
+    AXP192_LDO23OUT_VOL: 0xCF,
+    AXP202_OFF_CTL: 0x46,
+    AXP202_CHARGE1: 0xC0,
+    AXP202_POK_SET: 0x5D,
+    AXP202_INTEN1: 0xD8,
+    AXP202_INTEN2: 0xFF,
+    AXP202_INTEN3: 0x03,
+    AXP202_INTEN4: 0x01,
+    AXP202_ADC_EN1: 0x83,
+    AXP202_ADC_SPEED: 0x32,
+}
+
+
+def square(low, high, period, duty=0.5):
+    def wave(t):
+        return high if (t % period) < period * duty else low
+    return wave
+
+
+def ramp(start, end, duration):
+    def wave(t):
+        if t >= duration:
+            return end
+        return start + (end - start) * t / duration
+    return wave
+
+
+def sine(mean, amplitude, period):
+    def wave(t):
+        return mean + amplitude * math.sin(2 * math.pi * t / period)
+    return wave
+
+
+class AXPEmulator(object):
+
+    def __init__(self, chip=AXP202_CHIP_ID, address=None, irq_pin=35,
+                 attach=True):
+        self.chip = chip
+        if address is None:
+            if chip == AXP192_CHIP_ID:
+                address = AXP192_SLAVE_ADDRESS
+            else:
+                address = AXP202_SLAVE_ADDRESS
+        self.address = address
+        self.irq_pin = irq_pin
+        self.regs = bytearray(256)
+        reset = _RESET_AXP192 if chip == AXP192_CHIP_ID else _RESET_AXP202
+        for reg, val in reset.items():
+            self.regs[reg] = val
+        self.regs[AXP202_IC_TYPE] = chip
+        if chip == AXP192_CHIP_ID:
+            self.inten = (AXP192_INTEN1, AXP192_INTEN2, AXP192_INTEN3,
+                          AXP192_INTEN4, AXP192_INTEN5)
+            self.intsts = (AXP192_INTSTS1, AXP192_INTSTS2, AXP192_INTSTS3,
+                           AXP192_INTSTS4, AXP192_INTSTS5)
+        else:
+            self.inten = tuple(range(AXP202_INTEN1, AXP202_INTEN5 + 1))
+            self.intsts = tuple(range(AXP202_INTSTS1, AXP202_INTSTS5 + 1))
+
+        self.time = 0.0
+        self.waveforms = {}
+        self.percentage = 100
+        self.coulomb_in = 0.0
+        self.coulomb_out = 0.0
+        self.timer_left = None
+        self.alarms = 0
+        self.reads = 0
+        self.writes = 0
+        self.drive('batt_voltage', 4000)
+        self.drive('aps_voltage', 4000)
+        self.drive('temp', 40)
+        if attach:
+            machine.I2C.attach(address, self)
+
+    # scripted inputs
+
+    def drive(self, channel, source):
+        # source is a constant or a function of emulated time in seconds
+        if channel == 'batt_percentage':
+            self.percentage = source
+            return
+        if channel not in ADC_CHANNELS:
+            raise ValueError(channel)
+        self.waveforms[channel] = source
+
+    def value(self, channel):
+        source = self.waveforms.get(channel, 0)
+        if callable(source):
+            return source(self.time)
+        return source
+
+    def adc_rate(self):
+        return 25 << (self.regs[AXP202_ADC_SPEED] >> 6)
+
+    def step(self, dt):
+        # advance emulated time, integrating the coulomb counters and
+        # running the PMU timer
+        ctl = self.regs[AXP202_COULOMB_CTL]
+        if ctl & 0x80 and not ctl & 0x40:
+            # one counter LSB is 2^15 / (3600 * rate) mAh
+            scale = 3600.0 * self.adc_rate() / 32768 * dt / 3600
+            self.coulomb_in += self.value('batt_charge_current') * scale
+            self.coulomb_out += self.value('batt_discharge_current') * scale
+            self.__store_coulomb()
+        if self.timer_left is not None:
+            self.timer_left -= dt
+            if self.timer_left <= 0:
+                self.timer_left = None
+                self.regs[AXP202_TIMER_CTL] |= 0x80
+                self.raise_irq(AXP192_TIMER_TIMEOUT_IRQ if self.chip == AXP192_CHIP_ID
+                               else AXP202_TIMER_TIMEOUT_IRQ)
+        self.time += dt
+        self.__check_alarms()
+
+    def raise_irq(self, mask):
+        for i in range(5):
+            bits = (mask >> (8 * i)) & 0xFF
+            if bits:
+                self.regs[self.intsts[i]] |= bits
+        self.__update_pin()
+
+    def __check_alarms(self):
+        # threshold IRQs fire once on entering the condition
+        aps = self.value('aps_voltage')
+        if self.chip == AXP192_CHIP_ID:
+            levels = ((AXP202_APS_WARNING1, AXP202_APS_LOW_VOL_LEVEL2_IRQ),)
+        else:
+            levels = ((AXP202_APS_WARNING1, APX202_APS_LOW_VOL_LEVEL1_IRQ),
+                      (AXP202_APS_WARNING2, AXP202_APS_LOW_VOL_LEVEL2_IRQ))
+        active = 0
+        for reg, irq in levels:
+            if aps < 2867.2 + self.regs[reg] * 5.6:
+                active |= irq
+        if 'ts_voltage' in self.waveforms and not self.regs[AXP202_ADC_SPEED] & 0x04:
+            ts = self.value('ts_voltage')
+            if ts > self.regs[AXP202_TLTF_DISCHGSET] * 12.8:
+                active |= AXP202_BATT_LOW_TEMP_IRQ
+            if ts < self.regs[AXP202_THTF_DISCHGSET] * 12.8:
+                active |= AXP202_BATT_OVER_TEMP_IRQ
+        if active & ~self.alarms:
+            self.raise_irq(active & ~self.alarms)
+        self.alarms = active
+
+    def pending(self):
+        status = 0
+        for i in range(5):
+            status |= (self.regs[self.intsts[i]] & self.regs[self.inten[i]]) << (8 * i)
+        return status
+
+    def __update_pin(self):
+        if self.irq_pin is not None:
+            machine.Pin.drive(self.irq_pin, 0 if self.pending() else 1)
+
+    def __store_coulomb(self):
+        cin = int(self.coulomb_in) & 0xFFFFFFFF
+        cout = int(self.coulomb_out) & 0xFFFFFFFF
+        self.regs[AXP202_BAT_CHGCOULOMB3:AXP202_BAT_CHGCOULOMB3 + 4] = cin.to_bytes(4, 'big')
+        self.regs[AXP202_BAT_DISCHGCOULOMB3:AXP202_BAT_DISCHGCOULOMB3 + 4] = cout.to_bytes(4, 'big')
+
+    def __refresh_adc(self):
+        for name, (reg, bits, step, offset) in ADC_CHANNELS.items():
+            if name == 'batt_charge_current' and self.chip == AXP192_CHIP_ID:
+                bits = 5
+            if name == 'gpio0_voltage' and self.regs[AXP202_ADC_INPUTRANGE] & 1 or \
+                    name == 'gpio1_voltage' and self.regs[AXP202_ADC_INPUTRANGE] & 2:
+                offset = 700
+            raw = int(round((self.value(name) - offset) / step))
+            raw = max(0, min(raw, (1 << (8 + bits)) - 1))
+            self.regs[reg] = raw >> bits
+            self.regs[reg + 1] = raw & ((1 << bits) - 1)
+        current = self.value('batt_charge_current') or self.value('batt_discharge_current')
+        power = int(self.value('batt_voltage') * current / 1000 / 0.0011)
+        power = max(0, min(power, 0xFFFFFF))
+        self.regs[AXP202_BAT_POWERH8] = power >> 16
+        self.regs[AXP202_BAT_POWERM8] = (power >> 8) & 0xFF
+        self.regs[AXP202_BAT_POWERL8] = power & 0xFF
+        pct = self.percentage
+        self.regs[AXP202_BATT_PERCENTAGE] = int(pct(self.time) if callable(pct) else pct) & 0x7F
+
+    # I2C device interface used by machine.I2C
+
+    def read(self, reg, nbytes):
+        self.reads += 1
+        if reg + nbytes > 0x56 and reg <= AXP202_BATT_PERCENTAGE:
+            self.__refresh_adc()
+        out = bytearray(nbytes)
+        for i in range(nbytes):
+            out[i] = self.regs[(reg + i) & 0xFF]
+        return out
+
+    def write(self, reg, data):
+        # Multi-byte writes are register/data pairs as on the chip: the
+        # first byte goes to reg, then each (register, value) pair
+        self.writes += 1
+        if data:
+            self.__write_reg(reg, data[0])
+        for i in range(1, len(data) - 1, 2):
+            self.__write_reg(data[i], data[i + 1])
+        self.__update_pin()
+
+    def __write_reg(self, reg, val):
+        if reg in self.intsts:
+            self.regs[reg] &= ~val & 0xFF
+        elif reg == AXP202_IC_TYPE or 0x50 <= reg <= 0x7F or \
+                AXP202_BAT_CHGCOULOMB3 <= reg <= AXP202_BAT_DISCHGCOULOMB0 or \
+                reg == AXP202_BATT_PERCENTAGE:
+            pass
+        elif reg == AXP202_COULOMB_CTL:
+            if val & 0x20:
+                self.coulomb_in = 0.0
+                self.coulomb_out = 0.0
+                self.__store_coulomb()
+            self.regs[reg] = val & 0xC0
+        elif reg == AXP202_TIMER_CTL:
+            flag = self.regs[reg] & 0x80
+            if val & 0x80:
+                flag = 0
+            minutes = val & 0x7F
+            self.timer_left = minutes * 60.0 if minutes else None
+            self.regs[reg] = flag | minutes
+        else:
+            self.regs[reg] = val
@@ -0,0 +1,391 @@
+'''
+Bus-efficiency and decode-throughput benchmarks for axp202.PMU.
+
+Runs every public getter, the setters listed in SETTERS and a few
+realistic loops against the emulator in host/axpemu.py and reports, per
+case, bus transactions, bytes, wall time and allocations per call:
+
+    python3 host/bench.py                      # JSON to stdout
+    python3 host/bench.py --write-baseline     # refresh bench_baseline.json
+    python3 host/bench.py --compare            # non-zero exit on regression
+
+Startup is covered by the init:* cases, constructing a PMU with and
+without the probe, and by 'startup', which imports axp202 in a fresh
+interpreter and reports its module globals, import time and heap.
+
+Transactions and bytes are deterministic and are what --compare gates on,
+wall time is reported but depends on the host. Allocations are
+gc.mem_alloc() deltas where available (MicroPython) and the tracemalloc
+peak otherwise.
+'''
+import gc
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+import machine  # noqa: E402
+from axpemu import AXPEmulator, sine  # noqa: E402
+import axp202  # noqa: E402
+
+BASELINE = os.path.join(HERE, 'bench_baseline.json')
+
+# setter name: arguments used for the benchmark call
+SETTERS = {
+    'enablePower': (axp202.AXP202_LDO2,),
+    'disablePower': (axp202.AXP202_LDO2,),
+    'enableADC': (axp202.AXP202_ADC1, axp202.AXP202_VBUS_VOL_ADC1),
+    'disableADC': (axp202.AXP202_ADC1, axp202.AXP202_VBUS_VOL_ADC1),
+    'enableIRQ': (axp202.AXP202_ALL_IRQ,),
+    'disableIRQ': (axp202.AXP202_ALL_IRQ,),
+    'clearIRQ': (),
+    'ackIRQ': (),
+    'setDC1Voltage': (3300,),
+    'setDC2Voltage': (1200,),
+    'setDC3Voltage': (3300,),
+    'setLDO2Voltage': (3300,),
+    'setLDO3Voltage': (3300,),
+    'setLDO4Voltage': (axp202.AXP202_LDO4_3300MV,),
+    'setLDO3Mode': (axp202.AXP202_LDO3_LDO_MODE,),
+    'setVWarningLevel1': (3500,),
+    'setVWarningLevel2': (3300,),
+    'setChargeTempWindow': (2689, 347),
+    'setDischargeTempWindow': (2689, 347),
+    'setTimer': (5,),
+    'dump': (),
+    'setStartupTime': (axp202.AXP202_STARTUP_TIME_1S,),
+    'setlongPressTime': (axp202.AXP202_LONGPRESS_TIME_1S5,),
+    'setShutdownTime': (axp202.AXP202_SHUTDOWN_TIME_6S,),
+    'setTimeOutShutdown': (True,),
+    'enableChargeing': (),
+    'setChargingTargetVoltage': (axp202.AXP202_TARGET_VOL_4_2V,),
+    'setAdcSamplingRate': (axp202.AXP_ADC_SAMPLING_RATE_100HZ,),
+    'setTSCurrent': (axp202.AXP_TS_PIN_CURRENT_80UA,),
+    'setTSFunction': (axp202.AXP_TS_PIN_FUNCTION_BATT,),
+    'setTSMode': (axp202.AXP_TS_PIN_MODE_CHARGING,),
+    'setGPIOAdcRange': (0, axp202.AXP_GPIO_ADC_RANGE_0V_2V),
+    'enableCoulombcounter': (),
+    'disableCoulombcounter': (),
+    'stopCoulombcounter': (),
+    'clearCoulombcounter': (),
+    'setChgLEDChgControl': (),
+    'setChgLEDMode': (axp202.AXP20X_LED_BLINK_1HZ,),
+}
+
+# public methods that are not getters or setters of chip state
+NOT_BENCHED = (
+    'init_pins', 'init_i2c', 'init_device', 'read_byte', 'write_byte',
+    'read_word', 'read_word2', 'read_block', 'write_block', 'write_regs', 'batch',
+    'begin', 'commit', 'abort', 'enableCache', 'disableCache',
+    'invalidateCache', 'syncCache', 'onIRQ', 'removeIRQ', 'attachIRQ',
+    'detachIRQ', 'serviceIRQ', 'shutdown', 'select', 'readChannel',
+    'readChannels', 'decode', 'decodeRaw', 'convert', 'readInto',
+    'setIntegerMode', 'apply_profile', 'ntcVoltage', 'onLowBattery',
+    'onBattTemp', 'restore',
+    # rate limited by wall time, measured cold by loop:snapshot instead
+    'snapshot',
+)
+
+
+class _Alloc(object):
+    def __init__(self):
+        self.method = 'mem_alloc' if hasattr(gc, 'mem_alloc') else 'tracemalloc_peak'
+        if self.method == 'tracemalloc_peak':
+            import tracemalloc
+            self.tracemalloc = tracemalloc
+            tracemalloc.start()
+
+    def start(self):
+        gc.collect()
+        if self.method == 'mem_alloc':
+            self.base = gc.mem_alloc()
+        else:
+            self.tracemalloc.reset_peak()
+            self.base = self.tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        if self.method == 'mem_alloc':
+            return gc.mem_alloc() - self.base
+        return self.tracemalloc.get_traced_memory()[1] - self.base
+
+
+def make_pmu(chip=axp202.AXP202_CHIP_ID, **kwargs):
+    machine.I2C._devices.clear()
+    emu = AXPEmulator(chip=chip)
+    emu.drive('vbus_voltage', 5000)
+    emu.drive('vbus_current', sine(300, 50, 1.0))
+    emu.drive('batt_charge_current', 250)
+    emu.drive('batt_voltage', sine(3900, 20, 5.0))
+    emu.drive('batt_percentage', 80)
+    kwargs.setdefault('address', emu.address)
+    pmu = axp202.PMU(**kwargs)
+    return emu, pmu
+
+
+def measure(name, pmu, func, iterations, alloc):
+    # pmu is a PMU or, for bus-level cases, the I2C object itself
+    bus = getattr(pmu, 'bus', pmu)
+    tx = bus.transactions
+    nbytes = bus.bytes_read + bus.bytes_written
+    alloc.start()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    allocated = alloc.stop()
+    return {
+        'case': name,
+        'tx_per_call': (bus.transactions - tx) / iterations,
+        'bytes_per_call': (bus.bytes_read + bus.bytes_written - nbytes) / iterations,
+        'us_per_call': round(elapsed * 1000000 / iterations, 2),
+        'alloc_bytes': allocated,
+    }
+
+
+def _public(pmu):
+    # (getters, unbenched methods that take arguments)
+    getters = []
+    others = []
+    for name in dir(type(pmu)):
+        if name.startswith('_') or name in NOT_BENCHED or name in SETTERS:
+            continue
+        method = getattr(pmu, name)
+        if not callable(method):
+            continue
+        if method.__code__.co_argcount == 1:
+            getters.append(name)
+        else:
+            others.append(name)
+    return getters, others
+
+
+def telemetry_loop(pmu):
+    # the body of main.py's loop
+    def run():
+        pmu.getVbusVoltage()
+        pmu.getVbusCurrent()
+        pmu.getBattChargeCurrent()
+        pmu.getBattPercentage()
+    return run
+
+
+def telemetry_snapshot(pmu):
+    def run():
+        pmu.last_snapshot = None
+        pmu.snapshot()
+    return run
+
+
+def telemetry_select(pmu):
+    # main.py's ADC channels as one table-driven burst
+    sel = pmu.select('vbus_voltage', 'vbus_current', 'batt_charge_current')
+
+    def run():
+        pmu.readChannels(sel)
+        pmu.getBattPercentage()
+    return run
+
+
+def tbeam_bringup(pmu):
+    # TBeamGPS.py rail bring-up
+    def run():
+        pmu.setLDO2Voltage(3300)
+        pmu.setLDO3Voltage(3300)
+        pmu.enablePower(axp202.AXP192_LDO3)
+        pmu.enablePower(axp202.AXP192_LDO2)
+    return run
+
+
+def tbeam_profiles(pmu):
+    # TBeamGPS.py power states, switching GPS+LoRa -> LoRa only -> sleep
+    profiles = (
+        axp202.PowerProfile(rails={'ldo2': 3300, 'ldo3': 3300}, on=('ldo2', 'ldo3')),
+        axp202.PowerProfile(rails={'ldo2': 3300}, on=('ldo2',), off=('ldo3',)),
+        axp202.PowerProfile(off=('ldo2', 'ldo3')),
+    )
+
+    def run():
+        for profile in profiles:
+            pmu.apply_profile(profile)
+    return run
+
+
+def boot_restore(pmu):
+    # capture once, then restore on every boot with nothing to change
+    snapshot = pmu.dump()
+
+    def run():
+        pmu.restore(snapshot)
+    return run
+
+
+def shared_bus_poll():
+    # an AXP202 and an AXP192 on one I2CBus, three scheduled reads per PMU
+    from i2cbus import I2CBus
+    machine.I2C._devices.clear()
+    AXPEmulator()
+    AXPEmulator(chip=axp202.AXP192_CHIP_ID)
+    bus = I2CBus(machine.I2C(scl=22, sda=21))
+    for address in (axp202.AXP202_SLAVE_ADDRESS, axp202.AXP192_SLAVE_ADDRESS):
+        pmu = axp202.PMU(i2c=bus, address=address)
+        for names in (('vbus_voltage', 'vbus_current'), ('batt_voltage',), ('aps_voltage',)):
+            sel = pmu.select(*names)
+            bus.schedule(address, sel.first, sel.buf)
+    return bus.i2c, bus.poll
+
+
+def pok_setup(pmu):
+    def run():
+        with pmu.batch():
+            pmu.setStartupTime(axp202.AXP202_STARTUP_TIME_1S)
+            pmu.setlongPressTime(axp202.AXP202_LONGPRESS_TIME_1S5)
+            pmu.setShutdownTime(axp202.AXP202_SHUTDOWN_TIME_6S)
+            pmu.enablePower(axp202.AXP202_LDO2)
+            pmu.enablePower(axp202.AXP202_LDO3)
+    return run
+
+
+def import_cost():
+    # import axp202 in a fresh interpreter, the driver's own globals count
+    # is deterministic, time and heap depend on the host
+    code = (
+        'import sys, time, tracemalloc; sys.path[:0] = %r\n'
+        'import machine, micropython\n'
+        'tracemalloc.start(); start = time.perf_counter()\n'
+        'import axp202\n'
+        'elapsed = time.perf_counter() - start\n'
+        'print(len(vars(axp202)), round(elapsed * 1000000), tracemalloc.get_traced_memory()[0])\n'
+    ) % ([HERE, os.path.dirname(HERE)],)
+    import subprocess
+    out = subprocess.check_output([sys.executable, '-c', code]).split()
+    return {
+        'case': 'startup:import',
+        'module_globals': int(out[0]),
+        'us': int(out[1]),
+        'heap_bytes': int(out[2]),
+    }
+
+
+def init_cost(name, alloc, **kwargs):
+    # bus traffic and heap of constructing one PMU
+    machine.I2C._devices.clear()
+    machine.RTC._memory = b''
+    emu = AXPEmulator(chip=kwargs.pop('emu_chip', axp202.AXP202_CHIP_ID))
+    warm = kwargs.pop('warm', False)
+    if warm:
+        axp202.PMU(address=emu.address, **kwargs)
+    alloc.start()
+    start = time.perf_counter()
+    pmu = axp202.PMU(address=emu.address, **kwargs)
+    elapsed = time.perf_counter() - start
+    allocated = alloc.stop()
+    bus = pmu.bus
+    return {
+        'case': name,
+        'tx_per_call': bus.transactions,
+        'bytes_per_call': bus.bytes_read + bus.bytes_written,
+        'us_per_call': round(elapsed * 1000000, 2),
+        'alloc_bytes': allocated,
+    }
+
+
+def run(iterations=50):
+    alloc = _Alloc()
+    results = []
+    emu, pmu = make_pmu()
+    getters, skipped = _public(pmu)
+    for name in getters:
+        results.append(measure(name, pmu, getattr(pmu, name), iterations, alloc))
+    for name, args in sorted(SETTERS.items()):
+        method = getattr(pmu, name)
+        results.append(measure(name, pmu, lambda: method(*args), iterations, alloc))
+
+    results.append(measure('loop:main_telemetry', pmu, telemetry_loop(pmu), iterations, alloc))
+    results.append(measure('loop:snapshot', pmu, telemetry_snapshot(pmu), iterations, alloc))
+    results.append(measure('loop:select_telemetry', pmu, telemetry_select(pmu), iterations, alloc))
+    results.append(measure('loop:pok_setup_batch', pmu, pok_setup(pmu), iterations, alloc))
+    results.append(measure('loop:boot_restore', pmu, boot_restore(pmu), iterations, alloc))
+    emu, pmu = make_pmu(cache=True)
+    results.append(measure('loop:main_telemetry_cached', pmu, telemetry_loop(pmu), iterations, alloc))
+    results.append(measure('loop:pok_setup_batch_cached', pmu, pok_setup(pmu), iterations, alloc))
+    i2c, poll = shared_bus_poll()
+    results.append(measure('loop:shared_bus_poll', i2c, poll, iterations, alloc))
+    emu, pmu = make_pmu(threadsafe=True)
+    results.append(measure('loop:main_telemetry_threadsafe', pmu, telemetry_loop(pmu), iterations, alloc))
+    results.append(measure('loop:pok_setup_batch_threadsafe', pmu, pok_setup(pmu), iterations, alloc))
+    emu, pmu = make_pmu(axp202.AXP192_CHIP_ID)
+    results.append(measure('loop:tbeam_bringup', pmu, tbeam_bringup(pmu), iterations, alloc))
+    results.append(measure('loop:tbeam_profiles', pmu, tbeam_profiles(pmu), iterations, alloc))
+    emu, pmu = make_pmu(axp202.AXP192_CHIP_ID, cache=True)
+    results.append(measure('loop:tbeam_bringup_cached', pmu, tbeam_bringup(pmu), iterations, alloc))
+    results.append(measure('loop:tbeam_profiles_cached', pmu, tbeam_profiles(pmu), iterations, alloc))
+
+    results.append(init_cost('init:default', alloc))
+    results.append(init_cost('init:quiet', alloc, log=None))
+    results.append(init_cost('init:quiet_chip', alloc, log=None, chip=axp202.AXP202_CHIP_ID))
+    results.append(init_cost('init:probe_cache_wake', alloc, log=None, probe_cache=True, warm=True))
+    return {
+        'iterations': iterations,
+        'alloc_method': alloc.method,
+        'skipped': skipped,
+        'startup': import_cost(),
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    # regressions in the deterministic bus metrics
+    old = dict((r['case'], r) for r in baseline['results'])
+    regressions = []
+    if report['iterations'] != baseline['iterations']:
+        regressions.append('iterations %d differ from baseline %d' %
+                           (report['iterations'], baseline['iterations']))
+    for r in report['results']:
+        prev = old.get(r['case'])
+        if prev is None:
+            continue
+        for key in ('tx_per_call', 'bytes_per_call'):
+            if r[key] > prev[key]:
+                regressions.append('%s %s %s -> %s' % (r['case'], key, prev[key], r[key]))
+    return regressions
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('-n', '--iterations', type=int, default=50)
+    parser.add_argument('-o', '--output')
+    parser.add_argument('--write-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    args = parser.parse_args(argv)
+
+    stdout = sys.stdout
+    sys.stdout = sys.stderr  # keep the driver's init messages out of the JSON
+    try:
+        report = run(args.iterations)
+    finally:
+        sys.stdout = stdout
+
+    text = json.dumps(report, indent=1, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.write_baseline:
+        with open(BASELINE, 'w') as f:
+            f.write(text + '\n')
+    if args.compare:
+        with open(BASELINE) as f:
+            regressions = compare(report, json.load(f))
+        for line in regressions:
+            sys.stderr.write('REGRESSION ' + line + '\n')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,57 @@
+'''
+CPython stand-in for the MicroPython framebuf module, see host/machine.py.
+
+Only the formats st7789.blit() handles and FrameBuffer.pixel() are
+provided, with MicroPython's format numbers and memory layouts.
+'''
+
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+
+class FrameBuffer(object):
+    def __init__(self, buf, width, height, format, stride=None):
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.format = format
+        stride = width if stride is None else stride
+        # rows of the packed formats start on a byte, as on MicroPython
+        if format == MONO_HLSB:
+            stride = (stride + 7) & ~7
+        elif format == GS4_HMSB:
+            stride = (stride + 1) & ~1
+        self.stride = stride
+
+    def pixel(self, x, y, c=None):
+        buf = self.buf
+        if self.format == RGB565:
+            i = (y * self.stride + x) * 2
+            if c is None:
+                return buf[i] | (buf[i + 1] << 8)
+            buf[i] = c & 0xFF
+            buf[i + 1] = (c >> 8) & 0xFF
+        elif self.format == MONO_HLSB:
+            i = y * ((self.stride + 7) // 8) + x // 8
+            shift = 7 - x % 8
+            if c is None:
+                return (buf[i] >> shift) & 1
+            buf[i] = (buf[i] & ~(1 << shift)) | ((c & 1) << shift)
+        elif self.format == GS4_HMSB:
+            i = (y * self.stride + x) // 2
+            shift = 0 if x % 2 else 4
+            if c is None:
+                return (buf[i] >> shift) & 0x0F
+            buf[i] = (buf[i] & ~(0x0F << shift)) | ((c & 0x0F) << shift)
+        elif self.format == GS8:
+            i = y * self.stride + x
+            if c is None:
+                return buf[i]
+            buf[i] = c & 0xFF
+        else:
+            raise ValueError('format not supported on the host')
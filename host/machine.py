@@ -0,0 +1,202 @@
+'''
+CPython stand-in for the MicroPython machine module.
+
+Put this directory on sys.path ahead of the driver sources to run axp202
+and friends unmodified on a host:
+
+    PYTHONPATH=host:. python3 -c "import axp202"
+
+I2C transactions are routed to devices attached with I2C.attach(), such
+as the register-map emulator in host/axpemu.py. Pins keep their level and
+interrupt handler per pin number so an emulated device can drive the
+same pin the driver configured. SPI writes go to the device attached
+with SPI.attach(), which reads any DC or CS pins itself. Timers never
+fire on their own, call Timer.fire() to run the callback.
+'''
+import time as _time
+
+# MicroPython time helpers missing from CPython
+if not hasattr(_time, 'ticks_us'):
+    def _ticks_us():
+        return int(_time.perf_counter() * 1000000)
+
+    def _ticks_ms():
+        return int(_time.perf_counter() * 1000)
+
+    def _ticks_diff(a, b):
+        return a - b
+
+    def _ticks_add(a, b):
+        return a + b
+
+    def _sleep_ms(ms):
+        _time.sleep(ms / 1000)
+
+    def _sleep_us(us):
+        _time.sleep(us / 1000000)
+
+    _time.ticks_us = _ticks_us
+    _time.ticks_ms = _ticks_ms
+    _time.ticks_diff = _ticks_diff
+    _time.ticks_add = _ticks_add
+    _time.sleep_ms = _sleep_ms
+    _time.sleep_us = _sleep_us
+
+
+class Pin(object):
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    _levels = {}
+    _handlers = {}
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._levels.setdefault(id, 1)
+        self.init(mode, pull, value=value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if value is not None:
+            self._levels[self.id] = 1 if value else 0
+
+    def value(self, value=None):
+        if value is None:
+            return self._levels[self.id]
+        self.drive(self.id, value)
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        if handler is None:
+            self._handlers.pop(self.id, None)
+        else:
+            self._handlers[self.id] = (trigger, handler, self)
+
+    @classmethod
+    def drive(cls, id, level):
+        # set a pin level from outside and run its edge handler
+        level = 1 if level else 0
+        prev = cls._levels.get(id, 1)
+        cls._levels[id] = level
+        entry = cls._handlers.get(id)
+        if entry is None or prev == level:
+            return
+        trigger, handler, pin = entry
+        if (level == 0 and trigger & cls.IRQ_FALLING) or \
+                (level == 1 and trigger & cls.IRQ_RISING):
+            handler(pin)
+
+
+class I2C(object):
+    _devices = {}
+
+    def __init__(self, id=-1, scl=None, sda=None, freq=400000):
+        self.freq = freq
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    @classmethod
+    def attach(cls, address, device):
+        cls._devices[address] = device
+
+    @classmethod
+    def detach(cls, address):
+        cls._devices.pop(address, None)
+
+    def __device(self, addr):
+        device = self._devices.get(addr)
+        if device is None:
+            raise OSError(19)  # ENODEV, as on the ESP32 port
+        return device
+
+    def scan(self):
+        return sorted(self._devices)
+
+    def readfrom_mem_into(self, addr, memaddr, buf):
+        data = self.__device(addr).read(memaddr, len(buf))
+        buf[:] = data
+        self.transactions += 1
+        self.bytes_read += len(buf)
+
+    def readfrom_mem(self, addr, memaddr, nbytes):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf)
+        return bytes(buf)
+
+    def writeto_mem(self, addr, memaddr, buf):
+        self.__device(addr).write(memaddr, bytes(buf))
+        self.transactions += 1
+        self.bytes_written += len(buf)
+
+
+class SPI(object):
+    _device = None
+
+    def __init__(self, id=-1, baudrate=1000000, **kwargs):
+        self.baudrate = baudrate
+
+    @classmethod
+    def attach(cls, device):
+        cls._device = device
+
+    def write(self, buf):
+        if self._device is not None:
+            self._device.write(bytes(buf))
+
+
+class Timer(object):
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1):
+        self.id = id
+        self.callback = None
+
+    def init(self, mode=PERIODIC, freq=None, period=None, callback=None):
+        self.mode = mode
+        self.freq = freq
+        self.period = period
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+    def fire(self):
+        callback = self.callback
+        if callback is None:
+            return
+        if self.mode == self.ONE_SHOT:
+            self.callback = None
+        callback(self)
+
+
+class RTC(object):
+    _memory = b''
+
+    def memory(self, data=None):
+        if data is None:
+            return RTC._memory
+        RTC._memory = bytes(data)
+
+
+def freq():
+    return 240000000
+
+
+def reset():
+    raise SystemExit('machine.reset()')
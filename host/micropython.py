@@ -0,0 +1,35 @@
+'''
+CPython stand-in for the MicroPython micropython module, see host/machine.py.
+'''
+
+_queue = []
+_running = False
+
+
+def const(value):
+    # like the compiler on 32-bit ports, which only folds small ints
+    if not isinstance(value, int) or not -(1 << 30) <= value < (1 << 30):
+        raise SyntaxError('constant must be an integer')
+    return value
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(func, arg):
+    # Runs the callback as soon as the current scheduled callback (if any)
+    # has returned, like the MicroPython scheduler does between bytecodes
+    global _running
+    if len(_queue) >= 8:
+        raise RuntimeError('schedule queue full')
+    _queue.append((func, arg))
+    if _running:
+        return
+    _running = True
+    try:
+        while _queue:
+            func, arg = _queue.pop(0)
+            func(arg)
+    finally:
+        _running = False
@@ -0,0 +1,98 @@
+'''
+Behaviour tests for fuelgauge.FuelGauge against the register-map
+emulator in host/axpemu.py, which integrates the driven battery current
+into the coulomb counters:
+
+    python3 -m pytest -q host
+'''
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+import pytest  # noqa: E402
+
+import machine  # noqa: E402
+from axpemu import AXPEmulator  # noqa: E402
+import axp202  # noqa: E402
+from constants import (  # noqa: E402
+    AXP_ADC_SAMPLING_RATE_25HZ, AXP_ADC_SAMPLING_RATE_200HZ)
+from fuelgauge import FuelGauge, ocv_to_soc  # noqa: E402
+
+
+def make_gauge(**kwargs):
+    machine.I2C._devices.clear()
+    emu = AXPEmulator()
+    emu.drive('batt_voltage', 3870)  # 60 % on the OCV curve
+    pmu = axp202.PMU(address=emu.address, log=None)
+    # coulomb counting only, the voltage correction is tested apart
+    kwargs.setdefault('rest_weight', 0)
+    kwargs.setdefault('load_weight', 0)
+    return emu, pmu, FuelGauge(pmu, 2000, **kwargs)
+
+
+@pytest.mark.parametrize('rate', [AXP_ADC_SAMPLING_RATE_25HZ,
+                                  AXP_ADC_SAMPLING_RATE_200HZ])
+def test_rate_change_after_reset_keeps_the_counter_scale(rate):
+    emu, pmu, gauge = make_gauge()
+    start = gauge.soc
+    assert start == pytest.approx(60, abs=0.1)
+    pmu.setAdcSamplingRate(rate)
+    emu.drive('batt_discharge_current', 1000)
+    emu.step(720)  # 200 mAh, 10 % of 2000 mAh
+    assert gauge.update() == pytest.approx(start - 10, abs=0.1)
+
+
+@pytest.mark.parametrize('mv, soc', [(3000, 0), (3300, 0), (3650, 10),
+                                     (3870, 60), (4100, 92.5), (4200, 100)])
+def test_ocv_to_soc_interpolates_and_clamps(mv, soc):
+    assert ocv_to_soc(mv) == pytest.approx(soc)
+
+
+def test_charging_counts_up_and_clamps_at_full():
+    emu, pmu, gauge = make_gauge()
+    start = gauge.soc
+    emu.drive('batt_charge_current', 500)
+    emu.step(1440)  # 200 mAh
+    assert gauge.update() == pytest.approx(start + 10, abs=0.1)
+    emu.step(36000)
+    assert gauge.update() == 100
+
+
+def test_update_costs_two_transactions():
+    emu, pmu, gauge = make_gauge()
+    before = pmu.bus.transactions
+    gauge.update()
+    assert pmu.bus.transactions - before == 2
+
+
+def test_counter_wraparound():
+    emu, pmu, gauge = make_gauge()
+    start = gauge.soc
+    gauge.last_discharge = 0xFFFFFFF0
+    emu.coulomb_out = 0x10
+    emu.step(0)
+    assert gauge.update() == pytest.approx(start - 32 * gauge.lsb_mah * 100 / 2000)
+
+
+def test_voltage_correction_at_rest_and_under_load():
+    emu, pmu, gauge = make_gauge(rest_weight=0.5, load_weight=0.1)
+    gauge.reset(soc=80)
+    # at rest the estimate moves halfway to the 60 % of the OCV curve
+    assert gauge.update() == pytest.approx(70, abs=0.1)
+    emu.drive('batt_discharge_current', 400)
+    assert gauge.update() == pytest.approx(69, abs=0.1)
+
+
+def test_remaining_and_time_to_empty():
+    emu, pmu, gauge = make_gauge()
+    gauge.reset(soc=60)
+    emu.drive('batt_discharge_current', 1000)
+    gauge.update()
+    assert gauge.remaining() == pytest.approx(1200)
+    assert gauge.timeToEmpty() == pytest.approx(1.2, rel=0.01)
+    emu.drive('batt_discharge_current', 0)
+    emu.drive('batt_charge_current', 500)
+    gauge.update()
+    assert gauge.timeToEmpty() is None
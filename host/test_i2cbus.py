@@ -0,0 +1,78 @@
+'''
+Behaviour tests for i2cbus.I2CBus against two register-map emulators,
+an AXP202 and an AXP192, on one host I2C bus:
+
+    python3 -m pytest -q host
+'''
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+import machine  # noqa: E402
+from axpemu import AXPEmulator  # noqa: E402
+import axp202  # noqa: E402
+from constants import (  # noqa: E402
+    AXP192_CHIP_ID, AXP192_SLAVE_ADDRESS, AXP202_SLAVE_ADDRESS)
+from i2cbus import I2CBus  # noqa: E402
+
+
+def make_bus(**kwargs):
+    machine.I2C._devices.clear()
+    emus = (AXPEmulator(), AXPEmulator(chip=AXP192_CHIP_ID))
+    return emus, I2CBus(machine.I2C(scl=22, sda=21), **kwargs)
+
+
+def test_near_reads_of_one_device_share_a_burst():
+    (emu, emu192), bus = make_bus(max_gap=4)
+    emu.drive('vbus_voltage', 5000)
+    emu.drive('batt_voltage', 3900)
+    seen = []
+    vbus = bus.schedule(AXP202_SLAVE_ADDRESS, 0x5A, bytearray(2), seen.append)
+    # 0x5C..0x5D overlaps, 0x62 is four registers past 0x5E
+    bus.schedule(AXP202_SLAVE_ADDRESS, 0x5C, bytearray(2))
+    bus.schedule(AXP202_SLAVE_ADDRESS, 0x5B, bytearray(3))
+    edge = bus.schedule(AXP202_SLAVE_ADDRESS, 0x62, bytearray(1))
+    # five past the end, a burst of its own
+    batt = bus.schedule(AXP202_SLAVE_ADDRESS, 0x68, bytearray(2))
+    other = bus.schedule(AXP192_SLAVE_ADDRESS, 0x5A, bytearray(2))
+    assert bus.poll() == 3
+    assert [(dev.address, first, len(burst)) for dev, first, burst, parts in bus.plan] == [
+        (AXP192_SLAVE_ADDRESS, 0x5A, 2),
+        (AXP202_SLAVE_ADDRESS, 0x5A, 9),
+        (AXP202_SLAVE_ADDRESS, 0x68, 2),
+    ]
+    for job, emulator in ((vbus, emu), (edge, emu), (batt, emu), (other, emu192)):
+        reg, buf = job[1], job[2]
+        assert buf == emulator.regs[reg:reg + len(buf)]
+    assert seen == [vbus[2]]
+    assert bus.i2c.transactions == 3
+
+
+def test_unschedule_replans():
+    emus, bus = make_bus()
+    first = bus.schedule(AXP202_SLAVE_ADDRESS, 0x56, bytearray(2))
+    bus.schedule(AXP202_SLAVE_ADDRESS, 0x78, bytearray(2))
+    bus.schedule(AXP202_SLAVE_ADDRESS, 0x58, bytearray(2))
+    assert bus.poll() == 2
+    bus.unschedule(first)
+    assert bus.poll() == 2
+    assert [first for dev, first, burst, parts in bus.plan] == [0x58, 0x78]
+
+
+def test_stats_per_device():
+    emus, bus = make_bus()
+    pmu = axp202.PMU(i2c=bus, address=AXP202_SLAVE_ADDRESS, log=None)
+    bus.reset_stats()
+    sel = pmu.select('vbus_voltage', 'vbus_current')
+    bus.schedule(AXP202_SLAVE_ADDRESS, sel.first, sel.buf)
+    bus.schedule(AXP192_SLAVE_ADDRESS, 0x78, bytearray(2))
+    for _ in range(3):
+        bus.poll()
+    pmu.getBattVoltage()
+    stats = bus.stats()
+    # the PMU names its device once the chip is probed
+    assert stats['AXP202'][:2] == (4, 3 * len(sel.buf) + 2)
+    assert stats['0x34'][:2] == (3, 6)
+    assert bus.polls == 3
@@ -0,0 +1,271 @@
+'''
+Behaviour tests for axp202.PMU against the register-map emulator in
+host/axpemu.py. They check the register values the chip ends up with:
+
+    python3 -m pytest -q host
+'''
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+import pytest  # noqa: E402
+
+import machine  # noqa: E402
+import micropython  # noqa: E402
+from axpemu import AXPEmulator  # noqa: E402
+import axp202  # noqa: E402
+from constants import (  # noqa: E402
+    AXP192_CHIP_ID, AXP192_LDO2, AXP192_LDO23OUT_VOL, AXP202_ALL_IRQ,
+    AXP202_APS_WARNING1, AXP202_APS_WARNING2, AXP202_CHIP_ID,
+    AXP202_DC2OUT_VOL, AXP202_INTEN1, AXP202_LDO2, AXP202_LDO234_DC23_CTL,
+    AXP202_LDO24OUT_VOL, AXP202_LDO3, AXP202_LONGPRESS_TIME_2S,
+    AXP202_OFF_CTL, AXP202_PEK_SHORTPRESS_IRQ, AXP202_POK_SET,
+    AXP202_VBUS_CONNECT_IRQ, AXP202_VHTF_CHGSET, AXP202_VLTF_CHGSET,
+    AXP20X_LED_BLINK_1HZ, AXP20X_LED_LOW_LEVEL, AXP20X_LED_OFF)
+
+
+def make_pmu(chip=AXP202_CHIP_ID, **kwargs):
+    machine.I2C._devices.clear()
+    emu = AXPEmulator(chip=chip)
+    kwargs.setdefault('address', emu.address)
+    kwargs.setdefault('log', None)
+    return emu, axp202.PMU(**kwargs)
+
+
+@pytest.mark.parametrize('cache', [False, True])
+def test_failed_inner_batch_keeps_outer_batch(cache):
+    emu, pmu = make_pmu(cache=cache)
+    pmu.disablePower(AXP202_LDO2)
+    pmu.disablePower(AXP202_LDO3)
+    with pmu.batch():
+        pmu.enablePower(AXP202_LDO2)
+        try:
+            with pmu.batch():
+                pmu.enablePower(AXP202_LDO3)
+                pmu.setLDO2Voltage(1800)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        pmu.setLDO2Voltage(3300)
+        # still batched, nothing reached the chip yet
+        assert not emu.regs[AXP202_LDO234_DC23_CTL] & (1 << AXP202_LDO2)
+    ctl = emu.regs[AXP202_LDO234_DC23_CTL]
+    assert ctl & (1 << AXP202_LDO2)
+    assert not ctl & (1 << AXP202_LDO3)
+    assert emu.regs[AXP202_LDO24OUT_VOL] >> 4 == (3300 - 1800) // 100
+    assert pmu.pending is None
+    # later writes go straight to the chip again
+    pmu.setlongPressTime(AXP202_LONGPRESS_TIME_2S)
+    assert emu.regs[AXP202_POK_SET] & 0x30 == AXP202_LONGPRESS_TIME_2S << 4
+
+
+def test_failed_outer_batch_writes_nothing():
+    emu, pmu = make_pmu()
+    pmu.disablePower(AXP202_LDO2)
+    before = bytes(emu.regs)
+    with pytest.raises(RuntimeError):
+        with pmu.batch():
+            pmu.enablePower(AXP202_LDO2)
+            with pmu.batch():
+                pmu.setLDO2Voltage(2500)
+            raise RuntimeError
+    assert bytes(emu.regs) == before
+    assert pmu.pending is None and pmu.batch_depth == 0
+
+
+def test_batch_writes_land_on_their_registers():
+    emu, pmu = make_pmu()
+    writes = emu.writes
+    with pmu.batch():
+        pmu.setDC2Voltage(1200)       # 0x23
+        pmu.setLDO2Voltage(2500)      # 0x28
+        pmu.setlongPressTime(AXP202_LONGPRESS_TIME_2S)   # 0x36
+        pmu.setVWarningLevel1(3500)   # 0x3A
+        pmu.setVWarningLevel2(3300)   # 0x3B
+        pmu.setChargeTempWindow(2689, 347)
+    assert emu.writes == writes + 1
+    assert emu.regs[AXP202_DC2OUT_VOL] == (1200 - 700) // 25
+    assert emu.regs[AXP202_LDO24OUT_VOL] >> 4 == (2500 - 1800) // 100
+    assert emu.regs[AXP202_POK_SET] & 0x30 == AXP202_LONGPRESS_TIME_2S << 4
+    assert emu.regs[AXP202_APS_WARNING1] == (3500 - 2867) * 5 // 28
+    assert emu.regs[AXP202_APS_WARNING2] == (3300 - 2867) * 5 // 28
+    assert emu.regs[AXP202_VLTF_CHGSET] == 2689 * 10 // 128
+    assert emu.regs[AXP202_VHTF_CHGSET] == 347 * 10 // 128
+
+
+def test_ack_clears_only_the_events_read():
+    emu, pmu = make_pmu()
+    pmu.enableIRQ(AXP202_ALL_IRQ)
+    emu.raise_irq(AXP202_VBUS_CONNECT_IRQ)
+    pmu.readIRQ()
+    emu.raise_irq(AXP202_PEK_SHORTPRESS_IRQ)
+    pmu.ackIRQ()
+    assert emu.pending() == AXP202_PEK_SHORTPRESS_IRQ
+    assert emu.regs[AXP202_INTEN1] == 0xFF
+    pmu.clearIRQ()
+    assert emu.pending() == 0
+
+
+@pytest.mark.parametrize('chip', [AXP202_CHIP_ID, AXP192_CHIP_ID])
+def test_charge_current_setting_reads_back(chip):
+    emu, pmu = make_pmu(chip)
+    for ma in pmu.profile.chg_currents:
+        pmu.apply_profile(axp202.PowerProfile(charge_current=ma))
+        assert pmu.getSettingChargeCurrent() == ma
+
+
+@pytest.mark.parametrize('chip', [AXP202_CHIP_ID, AXP192_CHIP_ID])
+def test_rail_voltages_accept_floats(chip):
+    emu, pmu = make_pmu(chip)
+    reg, mask, shift, low, high, step = pmu.rails['ldo2']
+    pmu.setLDO2Voltage(3300.0)
+    assert (emu.regs[reg] & mask) >> shift == (3300 - low) // step
+    pmu.apply_profile(axp202.PowerProfile(rails={'ldo2': 2500.0}))
+    assert (emu.regs[reg] & mask) >> shift == (2500 - low) // step
+
+
+@pytest.mark.parametrize('integer', [False, True])
+def test_coulomb_data_in_mah(integer):
+    emu, pmu = make_pmu(AXP202_CHIP_ID)
+    pmu.setIntegerMode(integer)
+    pmu.clearCoulombcounter()
+    pmu.enableCoulombcounter()
+    emu.drive('batt_discharge_current', 1000)
+    emu.step(720)
+    mah = pmu.getCoulombData()
+    assert isinstance(mah, int) == integer
+    assert mah == pytest.approx(-200, abs=1)
+
+
+def log_writes(emu):
+    # registers in the order the emulator receives them
+    order = []
+    write = emu.write
+
+    def logged(reg, data):
+        order.append(reg)
+        order.extend(data[1::2])
+        write(reg, data)
+    emu.write = logged
+    return order
+
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_apply_profile_sets_voltage_before_enable(batched):
+    emu, pmu = make_pmu(AXP192_CHIP_ID)
+    pmu.disablePower(AXP192_LDO2)
+    pmu.setLDO2Voltage(1800)
+    pmu.setChgLEDMode(AXP20X_LED_OFF)
+    order = log_writes(emu)
+    profile = axp202.PowerProfile(rails={'ldo2': 3300}, on=('ldo2',))
+    if batched:
+        with pmu.batch():
+            pmu.setChgLEDMode(AXP20X_LED_BLINK_1HZ)
+            pmu.apply_profile(profile)
+            pmu.setChgLEDMode(AXP20X_LED_LOW_LEVEL)
+    else:
+        pmu.apply_profile(profile)
+    assert order.index(AXP192_LDO23OUT_VOL) < order.index(AXP202_LDO234_DC23_CTL)
+    assert emu.regs[AXP192_LDO23OUT_VOL] >> 4 == (3300 - 1800) // 100
+    assert emu.regs[AXP202_LDO234_DC23_CTL] & (1 << AXP192_LDO2)
+    if batched:
+        assert emu.regs[AXP202_OFF_CTL] & 0x30 == AXP20X_LED_LOW_LEVEL << 4
+        assert pmu.pending is None and pmu.batch_depth == 0
+
+
+@pytest.mark.parametrize('field', ['on', 'off'])
+def test_apply_profile_rejects_unknown_outputs(field):
+    emu, pmu = make_pmu(AXP192_CHIP_ID)
+    order = log_writes(emu)
+    profile = axp202.PowerProfile(rails={'ldo2': 3300}, **{field: ('ldo2', 'ldo9')})
+    with pytest.raises(ValueError):
+        pmu.apply_profile(profile)
+    assert order == []
+
+
+def test_restore_in_batch_switches_outputs_around_voltages():
+    emu, pmu = make_pmu(AXP192_CHIP_ID)
+    pmu.setLDO2Voltage(3300)
+    pmu.enablePower(AXP192_LDO2)
+    saved = pmu.dump()
+    pmu.disablePower(AXP192_LDO2)
+    pmu.setLDO2Voltage(1800)
+    order = log_writes(emu)
+    with pmu.batch():
+        pmu.restore(saved)
+    assert order.index(AXP192_LDO23OUT_VOL) < order.index(AXP202_LDO234_DC23_CTL)
+    assert bytes(pmu.dump()) == bytes(saved)
+
+
+class _Interrupting(object):
+    # Bus that runs callback once, right after the next read, the way a
+    # scheduled callback can run between two bytecodes of an operation
+    def __init__(self, bus, callback):
+        self.bus = bus
+        self.callback = callback
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        self.bus.readfrom_mem_into(addr, reg, buf)
+        callback, self.callback = self.callback, None
+        if callback is not None:
+            callback()
+
+    def __getattr__(self, name):
+        return getattr(self.bus, name)
+
+
+def test_callback_mid_operation_keeps_its_own_buffers():
+    emu, pmu = make_pmu(threadsafe=True)
+    emu.drive('vbus_voltage', 5000)
+    emu.drive('batt_voltage', 3900)
+    seen = []
+    pmu.bus = _Interrupting(pmu.bus, lambda: seen.append(pmu.getVbusVoltage()))
+    assert abs(pmu.getBattVoltage() - 3900) < 2
+    assert abs(seen[0] - 5000) < 2
+    # the outermost level is back on its own buffers
+    assert pmu.bytebuf is pmu.scratch[1][0]
+    assert pmu.bus_lock.depth == 0
+
+
+def test_deferred_irq_survives_a_full_schedule_queue(monkeypatch):
+    emu, pmu = make_pmu(threadsafe=True)
+    seen = []
+    pmu.onIRQ(AXP202_VBUS_CONNECT_IRQ, lambda pmu, events: seen.append(events))
+    emu.raise_irq(AXP202_VBUS_CONNECT_IRQ)
+
+    def full(func, arg):
+        raise RuntimeError('schedule queue full')
+    with pmu.bus_lock:
+        assert pmu.serviceIRQ() == 0
+        monkeypatch.setattr(micropython, 'schedule', full)
+    assert pmu.bus_lock.deferred and not seen
+    monkeypatch.undo()
+    # the next operation to release the lock schedules the service
+    pmu.getVbusVoltage()
+    assert seen == [AXP202_VBUS_CONNECT_IRQ]
+    assert not pmu.bus_lock.deferred
+
+
+def test_threadsafe_wraps_only_the_public_operations():
+    emu, pmu = make_pmu(threadsafe=True)
+    assert 'enablePower' in pmu.__dict__
+    for name in ('read_byte', 'write_regs', 'convert', 'decode'):
+        assert name not in pmu.__dict__
+
+
+def test_profiler_keeps_the_bus_lock():
+    from profiler import Profiler
+    emu, pmu = make_pmu(threadsafe=True)
+    locked = pmu.__dict__['enablePower']
+    profiler = Profiler(pmu)
+    profiler.enable()
+    pmu.enablePower(AXP202_LDO2)
+    profiler.disable()
+    assert pmu.__dict__['enablePower'] is locked
+    emu2, plain = make_pmu()
+    profiler = Profiler(plain)
+    profiler.enable()
+    profiler.disable()
+    assert 'enablePower' not in plain.__dict__
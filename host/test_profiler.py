@@ -0,0 +1,75 @@
+'''
+Behaviour tests for profiler.Profiler against the register-map emulator
+in host/axpemu.py. Restoring the bus lock wrappers of a threadsafe PMU
+is tested in host/test_pmu.py:
+
+    python3 -m pytest -q host
+'''
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+import machine  # noqa: E402
+from axpemu import AXPEmulator  # noqa: E402
+import axp202  # noqa: E402
+from constants import (  # noqa: E402
+    AXP202_ADC_SPEED, AXP202_BAT_CHGCOULOMB3, AXP202_LDO2,
+    AXP202_LDO234_DC23_CTL, AXP202_VBUS_VOL_H8)
+from profiler import Profiler  # noqa: E402
+
+
+def make_profiler():
+    machine.I2C._devices.clear()
+    emu = AXPEmulator()
+    pmu = axp202.PMU(address=emu.address, log=None)
+    return emu, pmu, Profiler(pmu)
+
+
+def test_counts_per_api_and_register():
+    emu, pmu, profiler = make_profiler()
+    profiler.enable()
+    pmu.getVbusVoltage()
+    pmu.getVbusVoltage()
+    pmu.enablePower(AXP202_LDO2)
+    calls, tx, nbytes = profiler.apis['getVbusVoltage'][:3]
+    assert (calls, tx) == (2, 2)
+    assert profiler.regs[(AXP202_VBUS_VOL_H8, 'r')] == [2, nbytes]
+    assert profiler.regs[(AXP202_LDO234_DC23_CTL, 'w')][0] == 1
+    assert sum(profiler.bus_hist) == sum(n for n, b in profiler.regs.values())
+
+
+def test_nested_calls_count_for_the_outer_api():
+    emu, pmu, profiler = make_profiler()
+    profiler.enable()
+    pmu.getCoulombData()
+    assert 'readCoulomb' not in profiler.apis
+    assert 'getAdcSamplingRate' not in profiler.apis
+    assert profiler.apis['getCoulombData'][:2] == [1, 2]
+    assert (AXP202_BAT_CHGCOULOMB3, 'r') in profiler.regs
+    assert (AXP202_ADC_SPEED, 'r') in profiler.regs
+
+
+def test_disable_restores_the_pmu():
+    emu, pmu, profiler = make_profiler()
+    bus = pmu.bus
+    profiler.enable()
+    profiler.enable()
+    profiler.disable()
+    profiler.disable()
+    assert pmu.bus is bus
+    assert [name for name in vars(pmu) if callable(getattr(type(pmu), name, None))] == []
+    pmu.getVbusVoltage()
+    assert profiler.apis == {}
+
+
+def test_report():
+    emu, pmu, profiler = make_profiler()
+    profiler.enable()
+    pmu.getVbusVoltage()
+    lines = profiler.report().split('\n')
+    assert lines[0] == 'api calls tx bytes avg_us max_us'
+    assert lines[1].startswith('getVbusVoltage 1 1 ')
+    assert '0x%02X r 1 ' % AXP202_VBUS_VOL_H8 in profiler.report()
+    assert lines[-1].startswith('bus_us_log2 ')
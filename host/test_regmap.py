@@ -0,0 +1,76 @@
+'''
+Behaviour tests for regmap and PMU.dump()/restore() against the
+register-map emulator in host/axpemu.py:
+
+    python3 -m pytest -q host
+'''
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+import machine  # noqa: E402
+from axpemu import AXPEmulator  # noqa: E402
+import axp202  # noqa: E402
+from constants import (  # noqa: E402
+    AXP192_CHIP_ID, AXP192_DC1_VLOTAGE, AXP192_INTEN5, AXP192_INTSTS1,
+    AXP192_LDO23OUT_VOL, AXP202_CHIP_ID, AXP202_INTEN5,
+    AXP202_LDO234_DC23_CTL, AXP202_OFF_CTL, AXP20X_LED_BLINK_4HZ)
+import regmap  # noqa: E402
+
+
+def make_pmu(chip=AXP202_CHIP_ID):
+    machine.I2C._devices.clear()
+    emu = AXPEmulator(chip=chip)
+    return emu, axp202.PMU(address=emu.address, log=None)
+
+
+def test_names_follow_the_chip():
+    assert regmap.names(AXP202_CHIP_ID)[AXP202_INTEN5] == 'INTEN5'
+    assert AXP192_DC1_VLOTAGE not in regmap.names(AXP202_CHIP_ID)
+    table = regmap.names(AXP192_CHIP_ID)
+    assert table[AXP192_DC1_VLOTAGE] == 'DC1_VLOTAGE'
+    assert table[AXP192_INTEN5] == 'INTEN5'
+    assert table[AXP192_INTSTS1] == 'INTSTS1'
+
+
+def test_render_spells_out_outputs_and_rails():
+    emu, pmu = make_pmu(AXP192_CHIP_ID)
+    pmu.setLDO2Voltage(1800)
+    lines = regmap.render(pmu.dump(), [AXP202_LDO234_DC23_CTL, AXP192_LDO23OUT_VOL])
+    assert lines == [
+        '0x12 LDO234_DC23_CTL      0x4D dc1=1 dc3=0 ldo2=1 ldo3=1 dc2=0 exten=1',
+        '0x28 LDO23OUT_VOL         0x0F ldo2_mv=1800 ldo3_mv=3300',
+    ]
+
+
+def test_diff_lists_changed_registers():
+    emu, pmu = make_pmu()
+    before = pmu.dump()
+    pmu.setChgLEDMode(AXP20X_LED_BLINK_4HZ)
+    after = pmu.dump()
+    changes = regmap.diff(before, after)
+    assert [reg for reg, old, new in changes] == [AXP202_OFF_CTL]
+    reg, old, new = changes[0]
+    assert regmap.render_diff(before, after) == [
+        '0x32 OFF_CTL              0x%02X -> 0x%02X' % (old, new)]
+
+
+def test_restore_writes_back_only_the_masked_changes():
+    emu, pmu = make_pmu(AXP192_CHIP_ID)
+    saved = pmu.dump()
+    pmu.setLDO2Voltage(1800)
+    pmu.setChgLEDMode(AXP20X_LED_BLINK_4HZ)
+    led = emu.regs[AXP202_OFF_CTL]
+    assert pmu.restore(saved, regmap.mask(AXP192_LDO23OUT_VOL)) == 1
+    assert emu.regs[AXP192_LDO23OUT_VOL] == saved[AXP192_LDO23OUT_VOL]
+    assert emu.regs[AXP202_OFF_CTL] == led
+    assert pmu.restore(saved) == 1
+    assert bytes(pmu.dump()) == bytes(saved)
+    assert pmu.restore(saved) == 0
+
+
+def test_mask_takes_registers_and_ranges():
+    m = regmap.mask(0x12, (0x40, 0x42))
+    assert [reg for reg in range(256) if m[reg]] == [0x12, 0x40, 0x41, 0x42]
@@ -0,0 +1,96 @@
+'''
+Behaviour tests for sampler.Sampler against the register-map emulator
+in host/axpemu.py. Timers only fire on the host when a test calls
+machine.Timer.fire(), or samples are taken by calling Sampler.sample():
+
+    python3 -m pytest -q host
+'''
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+import pytest  # noqa: E402
+
+import machine  # noqa: E402
+import micropython  # noqa: E402
+from axpemu import AXPEmulator  # noqa: E402
+import axp202  # noqa: E402
+from constants import (  # noqa: E402
+    AXP202_ADC_INPUTRANGE, AXP_ADC_SAMPLING_RATE_100HZ)
+from sampler import Sampler  # noqa: E402
+
+
+def make_pmu(**kwargs):
+    machine.I2C._devices.clear()
+    emu = AXPEmulator()
+    kwargs.setdefault('address', emu.address)
+    kwargs.setdefault('log', None)
+    return emu, axp202.PMU(**kwargs)
+
+
+def test_gpio_samples_use_the_input_range_of_the_chip():
+    emu, pmu = make_pmu()
+    # 0.7..2.7475 V range, set before this PMU instance existed
+    emu.regs[AXP202_ADC_INPUTRANGE] |= 1
+    emu.drive('gpio0_voltage', 1500)
+    sampler = Sampler(pmu, channels=('gpio0_voltage',))
+    sampler.start()
+    sampler.sample()
+    sampler.stop()
+    (mv,), = sampler.drain()
+    assert mv == pytest.approx(1500, abs=1)
+    assert mv == pytest.approx(pmu.getGPIO0Voltage(), abs=1)
+
+
+def test_ring_keeps_the_newest_samples():
+    emu, pmu = make_pmu()
+    emu.drive('batt_voltage', 3700)
+    sampler = Sampler(pmu, channels=('vbus_voltage', 'batt_voltage'), depth=4)
+    sampler.start()
+    for i in range(6):
+        emu.drive('vbus_voltage', 4000 + 100 * i)
+        sampler.timer.fire()
+    assert len(sampler) == 4 and sampler.overruns == 2
+    rows = sampler.drain()
+    assert [vbus for vbus, batt in rows] == pytest.approx([4200, 4300, 4400, 4500], abs=2)
+    assert [batt for vbus, batt in rows] == pytest.approx([3700] * 4, abs=2)
+    assert len(sampler) == 0 and sampler.drain() == []
+    sampler.timer.fire()
+    (vbus, batt), = sampler.drain()
+    assert vbus == pytest.approx(4500, abs=2)
+    sampler.stop()
+    assert sampler.timer is None
+
+
+def test_values_are_ints_in_integer_mode():
+    emu, pmu = make_pmu(integer=True)
+    emu.drive('vbus_voltage', 5000)
+    sampler = Sampler(pmu, channels=('vbus_voltage', 'vbus_current'))
+    sampler.sample()
+    (mv, ma), = sampler.drain()
+    assert type(mv) is int and type(ma) is int
+    assert mv == pytest.approx(5000, abs=2)
+
+
+@pytest.mark.parametrize('freq, expected', [(None, 100), (1000, 100), (10, 10)])
+def test_start_caps_the_rate_at_the_adc_rate(freq, expected):
+    emu, pmu = make_pmu()
+    pmu.setAdcSamplingRate(AXP_ADC_SAMPLING_RATE_100HZ)
+    sampler = Sampler(pmu)
+    sampler.start(freq)
+    assert sampler.timer.freq == expected
+    sampler.stop()
+
+
+def test_full_schedule_queue_counts_an_overrun(monkeypatch):
+    emu, pmu = make_pmu()
+    sampler = Sampler(pmu)
+    sampler.start()
+
+    def full(func, arg):
+        raise RuntimeError('schedule queue full')
+    monkeypatch.setattr(micropython, 'schedule', full)
+    sampler.timer.fire()
+    assert sampler.overruns == 1 and len(sampler) == 0
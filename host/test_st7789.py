@@ -0,0 +1,398 @@
+'''
+Behaviour tests for st7789.ST7789 against a model of the panel's command
+decoder and display memory. They check the pixels the panel ends up
+with and the SPI traffic it took:
+
+    python3 -m pytest -q host
+'''
+import os
+import random
+import sys
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [HERE, ROOT]
+
+import pytest  # noqa: E402
+
+import framebuf  # noqa: E402
+import machine  # noqa: E402
+
+CS_PIN = 5
+DC_PIN = 27
+
+
+class Panel(object):
+    # ST7789 as seen over SPI: CASET, RASET and RAMWR address a 240x320
+    # RGB565 memory, big-endian as on the wire, VSCRDEF and VSCSAD are
+    # kept as sent. Bytes written with DC low are commands, with DC high
+    # parameters or pixel data of the last command.
+    def __init__(self):
+        self.ram = bytearray(240 * 320 * 2)
+        self.params = {}
+        self.commands = []
+        self.sent = []  # (command, parameters) in the order sent
+        self.cs_assertions = 0
+        self.bytes = 0
+        self.command = None
+        self.caset = (0, 239)
+        self.raset = (0, 319)
+        self.pos = None
+        self.half = None
+        machine.Pin(CS_PIN).irq(self.__select, machine.Pin.IRQ_FALLING)
+
+    def __select(self, pin):
+        self.cs_assertions += 1
+
+    def write(self, data):
+        self.bytes += len(data)
+        if not machine.Pin(DC_PIN).value():
+            for command in data:
+                self.command = command
+                self.commands.append(command)
+                self.params[command] = b''
+                self.sent.append((command, bytearray()))
+                if command == 0x2C:
+                    self.pos = [self.caset[0], self.raset[0]]
+                    self.half = None
+        elif self.command == 0x2C:
+            self.__pixels(data)
+        else:
+            self.sent[-1][1].extend(data)
+            params = self.params[self.command] + data
+            self.params[self.command] = params
+            if self.command == 0x2A and len(params) == 4:
+                self.caset = ((params[0] << 8) | params[1],
+                              (params[2] << 8) | params[3])
+            elif self.command == 0x2B and len(params) == 4:
+                self.raset = ((params[0] << 8) | params[1],
+                              (params[2] << 8) | params[3])
+
+    def __pixels(self, data):
+        if self.half is not None:
+            data = bytes([self.half]) + data
+            self.half = None
+        if len(data) % 2:
+            self.half = data[-1]
+            data = data[:-1]
+        x, y = self.pos
+        for i in range(0, len(data), 2):
+            if y <= self.raset[1]:
+                o = (y * 240 + x) * 2
+                self.ram[o:o + 2] = data[i:i + 2]
+            x += 1
+            if x > self.caset[1]:
+                x = self.caset[0]
+                y += 1
+        self.pos = [x, y]
+
+    def px(self, x, y):
+        o = (y * 240 + x) * 2
+        return (self.ram[o] << 8) | self.ram[o + 1]
+
+    def visible(self, x, y):
+        # pixel shown at screen row y, through the VSCRDEF scroll area
+        # and the VSCSAD start line
+        scroll = self.params.get(0x33)
+        if scroll:
+            top = (scroll[0] << 8) | scroll[1]
+            rows = (scroll[2] << 8) | scroll[3]
+            start = self.params.get(0x37) or bytes((top >> 8, top & 0xFF))
+            start = (start[0] << 8) | start[1]
+            if top <= y < top + rows:
+                y = top + (y - top + start - top) % rows
+        return self.px(x, y)
+
+
+def load_driver():
+    # st7789.py ends in a demo that drives the display forever, only the
+    # driver above it is run
+    with open(os.path.join(ROOT, 'st7789.py')) as f:
+        src = f.read()
+    src = src[:src.index('\nif OPEN_AXP202:\n    a = ')]
+    module = types.ModuleType('st7789')
+    exec(compile(src, 'st7789.py', 'exec'), module.__dict__)
+    return module
+
+
+st7789 = load_driver()
+
+
+@pytest.fixture
+def make(monkeypatch):
+    # the reset and init delays are real sleeps on the host
+    monkeypatch.setattr(time, 'sleep', lambda s: None)
+    monkeypatch.setattr(time, 'sleep_ms', lambda ms: None)
+
+    def make(**kwargs):
+        panel = Panel()
+        machine.SPI.attach(panel)
+        display = st7789.ST7789(machine.SPI(1), cs=machine.Pin(CS_PIN),
+                                dc=machine.Pin(DC_PIN), rst=None, **kwargs)
+        return display, panel
+    yield make
+    machine.SPI.attach(None)
+
+
+def draw_script(seed, count=40):
+    # random fills and blits in every blit() format, partly off screen
+    rnd = random.Random(seed)
+    sizes = {framebuf.RGB565: lambda w, h: w * h * 2,
+             framebuf.MONO_HLSB: lambda w, h: (w + 7) // 8 * h,
+             framebuf.GS4_HMSB: lambda w, h: (w + 1) // 2 * h,
+             framebuf.GS8: lambda w, h: w * h}
+    ops = []
+    for _ in range(count):
+        x = rnd.randrange(-5, 240)
+        y = rnd.randrange(-5, 240)
+        w = rnd.randrange(1, 60)
+        h = rnd.randrange(1, 40)
+        fmt = rnd.choice([None] + list(sizes))
+        if fmt is None:
+            ops.append(('fill', x, y, w, h, rnd.getrandbits(16) | 1))
+        else:
+            buf = bytearray(rnd.getrandbits(8) for _ in range(sizes[fmt](w, h)))
+            ops.append(('blit', buf, x, y, w, h, fmt, rnd.random() < 0.5))
+    return ops
+
+
+def run(display, ops):
+    for op in ops:
+        if op[0] == 'fill':
+            display.fill_rectangle(*op[1:])
+        else:
+            display.blit(*op[1:7], swap=op[7])
+
+
+@pytest.mark.parametrize('stripe_rows', [None, 16, 3])
+def test_retained_draws_match_immediate_ones(make, stripe_rows):
+    ops = draw_script(3)
+    display, panel = make()
+    run(display, ops)
+    retained, retained_panel = make()
+    retained.retain(stripe_rows)
+    run(retained, ops)
+    sent = retained_panel.bytes
+    retained.flush()
+    assert retained_panel.ram == panel.ram
+    assert retained_panel.bytes - sent < panel.bytes
+
+
+def test_merged_flush_keeps_pixels_never_drawn(make):
+    display, panel = make()
+    display.fill_rectangle(0, 0, 240, 240, 0x1234)
+    display.retain()
+    display.fill_rectangle(0, 0, 10, 10, 0xF800)
+    display.fill_rectangle(11, 0, 10, 10, 0x07E0)
+    display.flush()
+    assert panel.px(5, 5) == 0xF800
+    assert panel.px(10, 5) == 0x1234
+    assert panel.px(15, 5) == 0x07E0
+
+
+def test_retain_after_immediate_starts_unknown(make):
+    display, panel = make()
+    display.retain()
+    display.fill_rectangle(0, 0, 240, 240, 0x1234)
+    display.flush()
+    display.immediate()
+    display.fill_rectangle(0, 0, 240, 240, 0x4321)
+    display.retain()
+    display.fill_rectangle(0, 0, 10, 10, 0xF800)
+    display.fill_rectangle(11, 0, 10, 10, 0x07E0)
+    display.flush()
+    assert panel.px(10, 5) == 0x4321
+
+
+def test_known_pixels_are_merged(make):
+    display, panel = make()
+    display.retain()
+    display.fill_rectangle(0, 0, 240, 240, 0x1234)
+    display.flush()
+    display.fill_rectangle(0, 0, 10, 10, 0xF800)
+    display.fill_rectangle(11, 0, 10, 10, 0x07E0)
+    assert len(display._dirty) == 1
+    windows = panel.commands.count(0x2C)
+    display.flush()
+    assert panel.commands.count(0x2C) == windows + 1
+    assert panel.px(10, 5) == 0x1234
+    assert panel.px(15, 5) == 0x07E0
+
+
+def level(value, mask, bg=0x0000, fg=0xFFFF):
+    # RGB565 colour of a grey level, spread from bg to fg per channel
+    c = 0
+    for lo, bits in ((0, 0x1F), (5, 0x3F), (11, 0x1F)):
+        b = (bg >> lo) & bits
+        f = (fg >> lo) & bits
+        c |= (b + (f - b) * value // mask) << lo
+    return c
+
+
+@pytest.mark.parametrize('fmt, mask', [(framebuf.MONO_HLSB, 0x01),
+                                       (framebuf.GS4_HMSB, 0x0F),
+                                       (framebuf.GS8, 0xFF)])
+def test_lut_blit_expands_every_level(make, fmt, mask):
+    # odd width, so rows end inside a source byte
+    w, h = 13, 11
+    rnd = random.Random(fmt)
+    buf = bytearray(rnd.getrandbits(8) for _ in range(w * h * 2))
+    fb = framebuf.FrameBuffer(buf, w, h, fmt)
+    display, panel = make()
+    display.blit(buf, 7, 9, w, h, fmt)
+    for y in range(h):
+        for x in range(w):
+            assert panel.px(7 + x, 9 + y) == level(fb.pixel(x, y), mask)
+
+
+def test_mono_blit_matches_the_framebuffer_path(make):
+    w, h = 21, 6
+    rnd = random.Random(1)
+    buf = bytearray(rnd.getrandbits(8) for _ in range((w + 7) // 8 * h))
+    display, panel = make()
+    display.blit(framebuf.FrameBuffer(buf, w, h, framebuf.MONO_HLSB), 3, 4, w, h)
+    fast, fast_panel = make()
+    fast.blit(buf, 3, 4, w, h, framebuf.MONO_HLSB)
+    assert fast_panel.ram == panel.ram
+
+
+@pytest.mark.parametrize('retained', [False, True])
+def test_blit_rejects_unsupported_formats(make, retained):
+    display, panel = make()
+    if retained:
+        display.retain()
+    sent = panel.bytes
+    with pytest.raises(ValueError):
+        display.blit(bytearray(8), 0, 0, 8, 8, framebuf.MONO_VLSB)
+    display.flush()
+    assert panel.bytes == sent
+
+
+def test_scroll_rejects_unsupported_formats(make):
+    display, panel = make()
+    display.set_scroll_area(20, 20)
+    commands = len(panel.commands)
+    with pytest.raises(ValueError):
+        display.scroll(8, bytearray(240), framebuf.MONO_VLSB)
+    assert len(panel.commands) == commands
+
+
+def test_init_sends_one_command_per_cs_assertion(make, monkeypatch):
+    delays = []
+    monkeypatch.setattr(time, 'sleep_ms', delays.append)
+    display, panel = make()
+    sent = [(c, bytes(p)) for c, p in panel.sent]
+    assert sent == [
+        (0x01, b''),
+        (0x11, b''),
+        (0x13, b''),
+        (0x36, bytes((st7789.TFT_MAD_COLOR_ORDER,))),
+        (0xB6, b'\x0a\x82'),
+        (0x3A, b'\x55'),
+        (0xB2, b'\x0c\x0c\x00\x33\x33'),
+        (0xB7, b'\x35'),
+        (0xBB, b'\x28'),
+        (0xC0, b'\x0c'),
+        (0xC2, b'\x01\xff'),
+        (0xC3, b'\x10'),
+        (0xC4, b'\x20'),
+        (0xC6, b'\x0f'),
+        (0xD0, b'\xa4\xa1'),
+        (0xD0, b'\xd0\x00\x02\x07\x0a\x28\x32\x44\x42\x06\x0e\x12\x14\x17'),
+        (0xE1, b'\xd0\x00\x02\x07\x0a\x28\x31\x54\x47\x0e\x1c\x17\x1b\x1e'),
+        (0x21, b''),
+        (0x2A, b'\x00\x00\x00\xe5'),
+        (0x2B, b'\x00\x00\x01\x3f'),
+        (0x29, b''),
+    ]
+    assert panel.cs_assertions == len(sent)
+    assert delays == [120, 10, 120, 120]
+
+
+def test_fill_covers_the_rectangle_only(make):
+    display, panel = make()
+    sent = panel.bytes
+    # 5000 pixels, four full chunks and a partial one
+    display.fill_rectangle(10, 20, 100, 50, 0xA5C3)
+    # CASET, RASET and RAMWR, then only the pixels
+    assert panel.bytes - sent == 5 + 5 + 1 + 5000 * 2
+    for x, y in ((10, 20), (109, 20), (10, 69), (109, 69), (60, 45)):
+        assert panel.px(x, y) == 0xA5C3
+    for x, y in ((9, 20), (110, 20), (10, 19), (10, 70)):
+        assert panel.px(x, y) == 0
+
+
+def test_fill_reuses_cached_color_chunks(make):
+    display, panel = make(chunk_cache=2)
+    display.fill_rectangle(0, 0, 10, 10, 0x1111)
+    first = display._chunks[0][1]
+    display.fill_rectangle(0, 0, 10, 10, 0x2222)
+    display.fill_rectangle(0, 0, 10, 10, 0x1111)
+    assert display._chunks[0][1] is first
+    assert [c for c, buf in display._chunks] == [0x1111, 0x2222]
+    # a third color refills the least recently used chunk
+    second = display._chunks[1][1]
+    display.fill_rectangle(0, 0, 10, 10, 0x3333)
+    assert [c for c, buf in display._chunks] == [0x3333, 0x1111]
+    assert display._chunks[0][1] is second
+    assert panel.px(9, 9) == 0x3333
+
+
+def test_fill_without_color_uses_the_background(make):
+    display, panel = make()
+    display.fill_rectangle(0, 0, 240, 240, 0xFFFF)
+    display.fill_rectangle(5, 5, 3, 3)
+    assert panel.px(6, 6) == 0x0000
+    assert panel.px(8, 6) == 0xFFFF
+
+
+def test_scroll_area_definition(make):
+    display, panel = make()
+    display.set_scroll_area(40, 40)
+    # the 80 rows of panel memory below the screen join the bottom area
+    assert panel.params[0x33] == b'\x00\x28\x00\xa0\x00\x78'
+    assert panel.params[0x37] == b'\x00\x28'
+
+
+@pytest.mark.parametrize('retained', [False, True])
+def test_scroll_draws_the_exposed_lines(make, retained):
+    display, panel = make()
+    for y in range(240):
+        display.fill_rectangle(0, y, 240, 1, y + 1)
+    if retained:
+        display.retain()
+    display.set_scroll_area(40, 40)
+    screen = list(range(1, 241))
+    for lines, color in ((8, 0x1000), (30, 0x2000), (-12, 0x3000),
+                         (150, 0x4000), (-200, 0x5000), (0, 0x6000)):
+        display.scroll(lines, color=color)
+        area = screen[40:200]
+        n = min(len(area), abs(lines))
+        if lines > 0:
+            area = area[n:] + [color] * n
+        elif n:
+            area = [color] * n + area[:-n]
+        screen[40:200] = area
+        for y in range(240):
+            assert panel.visible(0, y) == screen[y]
+            assert panel.visible(239, y) == screen[y]
+
+
+def test_scroll_blits_the_exposed_lines_from_a_buffer(make):
+    display, panel = make()
+    display.set_scroll_area(40, 40)
+    display.scroll(150, color=0x1234)
+    # 20 new lines, wrapping from the bottom of the area to its top
+    buf = bytearray(240 * 20 * 2)
+    for row in range(20):
+        for x in range(240):
+            o = (row * 240 + x) * 2
+            buf[o] = x
+            buf[o + 1] = row + 1
+    display.scroll(20, buf)
+    for row in range(20):
+        for x in (0, 100, 239):
+            assert panel.visible(x, 180 + row) == ((row + 1) << 8) | x
+    assert panel.visible(0, 179) == 0x1234
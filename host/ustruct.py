@@ -0,0 +1,4 @@
+'''
+CPython stand-in for the MicroPython ustruct module, see host/machine.py.
+'''
+from struct import *
@@ -0,0 +1,195 @@
+'''
+MIT License
+
+Copyright (c) 2019 lewis he
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+i2cbus.py - Shared I2C bus manager for PMUs and other peripherals.
+'''
+import time
+from machine import I2C, Pin
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+
+class Device(object):
+    # One device's view of a shared bus. It has the I2C methods the
+    # drivers use, so PMU(i2c=bus) talks through it unchanged, and keeps
+    # per-device transaction, byte and busy time counters.
+
+    def __init__(self, bus, address, name=None):
+        self.bus = bus
+        self.address = address
+        self.name = name if name is not None else '0x%02X' % address
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.busy_us = 0
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        bus = self.bus
+        bus.acquire()
+        try:
+            start = time.ticks_us()
+            bus.i2c.readfrom_mem_into(addr, reg, buf)
+            self.busy_us += time.ticks_diff(time.ticks_us(), start)
+        finally:
+            bus.release()
+        self.transactions += 1
+        self.bytes_read += len(buf)
+
+    def writeto_mem(self, addr, reg, buf):
+        bus = self.bus
+        bus.acquire()
+        try:
+            start = time.ticks_us()
+            bus.i2c.writeto_mem(addr, reg, buf)
+            self.busy_us += time.ticks_diff(time.ticks_us(), start)
+        finally:
+            bus.release()
+        self.transactions += 1
+        self.bytes_written += len(buf)
+
+    def readfrom_mem(self, addr, reg, nbytes):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, reg, buf)
+        return bytes(buf)
+
+
+class I2CBus(object):
+    # Owns one I2C peripheral shared by several devices. Every transaction
+    # holds the bus lock, so drivers in different threads never interleave
+    # on the wire. Periodic reads registered with schedule() are merged
+    # per device into as few bursts as possible and run by poll():
+    #
+    #   bus = I2CBus(scl=22, sda=21)
+    #   pmu = axp202.PMU(i2c=bus)
+    #   sel = pmu.select('vbus_voltage', 'batt_voltage')
+    #   bus.schedule(pmu.address, sel.first, sel.buf,
+    #                lambda buf: print(pmu.decode(sel)))
+    #   while True:
+    #       bus.poll()
+
+    def __init__(self, i2c=None, scl=None, sda=None, freq=400000,
+                 max_gap=4):
+        if i2c is None:
+            i2c = I2C(scl=Pin(scl), sda=Pin(sda), freq=freq)
+        self.i2c = i2c
+        # registers that may be read in between two jobs to merge them
+        self.max_gap = max_gap
+        self.lock = _thread.allocate_lock() if _thread else None
+        self.devices = {}
+        self.jobs = []
+        self.plan = None
+        self.polls = 0
+        self.since = time.ticks_us()
+
+    def acquire(self):
+        if self.lock:
+            self.lock.acquire()
+
+    def release(self):
+        if self.lock:
+            self.lock.release()
+
+    def device(self, address, name=None):
+        dev = self.devices.get(address)
+        if dev is None:
+            dev = Device(self, address, name)
+            self.devices[address] = dev
+        elif name is not None:
+            dev.name = name
+        return dev
+
+    def scan(self):
+        self.acquire()
+        try:
+            return self.i2c.scan()
+        finally:
+            self.release()
+
+    def schedule(self, address, reg, buf, callback=None):
+        # Read len(buf) bytes from reg into buf on every poll(), then call
+        # callback(buf). Returns a handle for unschedule().
+        job = (self.device(address), reg, buf, callback)
+        self.jobs.append(job)
+        self.plan = None
+        return job
+
+    def unschedule(self, job):
+        self.jobs.remove(job)
+        self.plan = None
+
+    def __build_plan(self):
+        # Sort the jobs per device and merge those whose register spans
+        # overlap or lie within max_gap of each other into one burst:
+        # [(device, first reg, burst buffer, ((job, offset), ...)), ...]
+        plan = []
+        jobs = sorted(self.jobs, key=lambda j: (j[0].address, j[1]))
+        i = 0
+        while i < len(jobs):
+            dev, first, buf, _ = jobs[i]
+            end = first + len(buf)
+            j = i + 1
+            while j < len(jobs) and jobs[j][0] is dev and \
+                    jobs[j][1] <= end + self.max_gap:
+                end = max(end, jobs[j][1] + len(jobs[j][2]))
+                j += 1
+            burst = bytearray(end - first)
+            view = memoryview(burst)
+            parts = tuple((job, view[job[1] - first:job[1] - first + len(job[2])])
+                          for job in jobs[i:j])
+            plan.append((dev, first, burst, parts))
+            i = j
+        self.plan = plan
+
+    def poll(self):
+        # One pass over every scheduled read, returns the number of bursts
+        if self.plan is None:
+            self.__build_plan()
+        for dev, first, burst, parts in self.plan:
+            dev.readfrom_mem_into(dev.address, first, burst)
+            for job, view in parts:
+                job[2][:] = view
+                if job[3] is not None:
+                    job[3](job[2])
+        self.polls += 1
+        return len(self.plan)
+
+    def stats(self):
+        # {device name: (transactions, bytes, busy us, share of wall time)}
+        elapsed = max(1, time.ticks_diff(time.ticks_us(), self.since))
+        out = {}
+        for dev in self.devices.values():
+            out[dev.name] = (dev.transactions,
+                             dev.bytes_read + dev.bytes_written,
+                             dev.busy_us, dev.busy_us / elapsed)
+        return out
+
+    def reset_stats(self):
+        for dev in self.devices.values():
+            dev.reset()
+        self.polls = 0
+        self.since = time.ticks_us()
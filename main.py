@@ -26,17 +26,18 @@ Created by Lewis he on June 24, 2019.
 github:https://github.com/lewisxhe/AXP202X_Libraries
 '''
 import axp202
+import constants
 import time
 
 
 a = axp202.PMU()
-a.setChgLEDMode(axp202.AXP20X_LED_BLINK_1HZ)
-a.enablePower(axp202.AXP202_LDO2)
+a.setChgLEDMode(constants.AXP20X_LED_BLINK_1HZ)
+a.enablePower(constants.AXP202_LDO2)
 a.setLDO2Voltage(1800)
-a.enableADC(axp202.AXP202_ADC1, axp202.AXP202_VBUS_VOL_ADC1)
-a.enableADC(axp202.AXP202_ADC1, axp202.AXP202_VBUS_CUR_ADC1)
-a.enableADC(axp202.AXP202_ADC1, axp202.AXP202_BATT_VOL_ADC1)
-a.enableADC(axp202.AXP202_ADC1, axp202.AXP202_BATT_CUR_ADC1)
+a.enableADC(constants.AXP202_ADC1, constants.AXP202_VBUS_VOL_ADC1)
+a.enableADC(constants.AXP202_ADC1, constants.AXP202_VBUS_CUR_ADC1)
+a.enableADC(constants.AXP202_ADC1, constants.AXP202_BATT_VOL_ADC1)
+a.enableADC(constants.AXP202_ADC1, constants.AXP202_BATT_CUR_ADC1)
 
 
 while True:
@@ -0,0 +1,163 @@
+'''
+MIT License
+
+Copyright (c) 2019 lewis he
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+profiler.py - I2C transaction profiler for the AXP202/AXP192 driver.
+'''
+import time
+
+_BUCKETS = 16
+
+
+def _bucket(us):
+    # log2 latency bucket, bucket i holds [2^i, 2^(i+1)) microseconds
+    i = 0
+    while us > 1 and i < _BUCKETS - 1:
+        us >>= 1
+        i += 1
+    return i
+
+
+class _BusProbe(object):
+    # Stands in for pmu.bus while profiling and counts real transactions
+
+    def __init__(self, profiler, bus):
+        self.profiler = profiler
+        self.bus = bus
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        start = time.ticks_us()
+        self.bus.readfrom_mem_into(addr, reg, buf)
+        self.profiler.record('r', reg, len(buf),
+                             time.ticks_diff(time.ticks_us(), start))
+
+    def writeto_mem(self, addr, reg, buf):
+        start = time.ticks_us()
+        self.bus.writeto_mem(addr, reg, buf)
+        self.profiler.record('w', reg, len(buf),
+                             time.ticks_diff(time.ticks_us(), start))
+
+    def __getattr__(self, name):
+        return getattr(self.bus, name)
+
+
+class Profiler(object):
+    # Counts bus transactions and bytes per register and per public PMU
+    # method, with log2 latency histograms. Instrumentation is installed
+    # as instance attributes by enable() and disable() puts back what was
+    # there before, the plain class methods or the bus lock wrappers of a
+    # threadsafe PMU.
+
+    SKIP = ('init_pins', 'init_i2c', 'init_device')
+
+    def __init__(self, pmu):
+        self.pmu = pmu
+        self.enabled = False
+        self.api = None
+        self.wrapped = []
+        self.reset()
+
+    def reset(self):
+        # api -> [calls, transactions, bytes, total us, max us, histogram]
+        self.apis = {}
+        # (register, 'r' or 'w') -> [transactions, bytes]
+        self.regs = {}
+        self.bus_hist = [0] * _BUCKETS
+
+    def enable(self):
+        if self.enabled:
+            return
+        pmu = self.pmu
+        pmu.bus = _BusProbe(self, pmu.bus)
+        for name in dir(type(pmu)):
+            if name.startswith('_') or name in self.SKIP:
+                continue
+            method = getattr(pmu, name)
+            if callable(method):
+                self.wrapped.append((name, pmu.__dict__.get(name)))
+                setattr(pmu, name, self.__wrap(name, method))
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        pmu = self.pmu
+        pmu.bus = pmu.bus.bus
+        for name, previous in self.wrapped:
+            if previous is None:
+                delattr(pmu, name)
+            else:
+                setattr(pmu, name, previous)
+        self.wrapped = []
+        self.enabled = False
+
+    def __wrap(self, name, method):
+        def wrapper(*args, **kwargs):
+            if self.api is not None:
+                return method(*args, **kwargs)
+            self.api = name
+            stats = self.__api(name)
+            start = time.ticks_us()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                us = time.ticks_diff(time.ticks_us(), start)
+                self.api = None
+                stats[0] += 1
+                stats[3] += us
+                if us > stats[4]:
+                    stats[4] = us
+                stats[5][_bucket(us)] += 1
+        return wrapper
+
+    def __api(self, name):
+        stats = self.apis.get(name)
+        if stats is None:
+            stats = [0, 0, 0, 0, 0, [0] * _BUCKETS]
+            self.apis[name] = stats
+        return stats
+
+    def record(self, kind, reg, nbytes, us):
+        key = (reg, kind)
+        counts = self.regs.get(key)
+        if counts is None:
+            counts = [0, 0]
+            self.regs[key] = counts
+        counts[0] += 1
+        counts[1] += nbytes
+        self.bus_hist[_bucket(us)] += 1
+        stats = self.__api(self.api if self.api is not None else '-')
+        stats[1] += 1
+        stats[2] += nbytes
+
+    def report(self):
+        lines = ['api calls tx bytes avg_us max_us']
+        for name in sorted(self.apis):
+            calls, tx, nbytes, total, peak, hist = self.apis[name]
+            avg = total // calls if calls else 0
+            lines.append('%s %d %d %d %d %d' % (name, calls, tx, nbytes, avg, peak))
+        lines.append('reg rw tx bytes')
+        for reg, kind in sorted(self.regs):
+            tx, nbytes = self.regs[(reg, kind)]
+            lines.append('0x%02X %s %d %d' % (reg, kind, tx, nbytes))
+        lines.append('bus_us_log2 ' + ' '.join(str(n) for n in self.bus_hist))
+        return '\n'.join(lines)
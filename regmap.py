@@ -0,0 +1,171 @@
+'''
+MIT License
+
+Copyright (c) 2019 lewis he
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+regmap.py - Register dump decoding and diffing for AXP202/AXP192.
+'''
+import constants
+from constants import AXP192_CHIP_ID, AXP202_IC_TYPE
+from axp202 import _PROFILES
+
+# Register names are the constants.py names, read on first use so the
+# table costs nothing unless a dump is decoded. AXP192 entries override
+# the AXP202 ones where the chips differ.
+_AXP202_NAMES = (
+    'STATUS', 'MODE_CHGSTATUS', 'OTG_STATUS', 'IC_TYPE',
+    'DATA_BUFFER1', 'DATA_BUFFER2', 'DATA_BUFFER3', 'DATA_BUFFER4',
+    'DATA_BUFFER5', 'DATA_BUFFER6', 'DATA_BUFFER7', 'DATA_BUFFER8',
+    'DATA_BUFFER9', 'DATA_BUFFERA', 'DATA_BUFFERB', 'DATA_BUFFERC',
+    'LDO234_DC23_CTL', 'DC2OUT_VOL', 'LDO3_DC2_DVM', 'DC3OUT_VOL',
+    'LDO24OUT_VOL', 'LDO3OUT_VOL', 'IPS_SET', 'VOFF_SET', 'OFF_CTL',
+    'CHARGE1', 'CHARGE2', 'BACKUP_CHG', 'POK_SET', 'DCDC_FREQSET',
+    'VLTF_CHGSET', 'VHTF_CHGSET', 'APS_WARNING1', 'APS_WARNING2',
+    'TLTF_DISCHGSET', 'THTF_DISCHGSET',
+    'INTEN1', 'INTEN2', 'INTEN3', 'INTEN4', 'INTEN5',
+    'INTSTS1', 'INTSTS2', 'INTSTS3', 'INTSTS4', 'INTSTS5',
+    'BAT_VOL_H8', 'BAT_VOL_L4', 'ACIN_VOL_H8', 'ACIN_VOL_L4',
+    'ACIN_CUR_H8', 'ACIN_CUR_L4', 'VBUS_VOL_H8', 'VBUS_VOL_L4',
+    'VBUS_CUR_H8', 'VBUS_CUR_L4', 'INTERNAL_TEMP_H8', 'INTERNAL_TEMP_L4',
+    'TS_IN_H8', 'TS_IN_L4', 'GPIO0_VOL_ADC_H8', 'GPIO0_VOL_ADC_L4',
+    'GPIO1_VOL_ADC_H8', 'GPIO1_VOL_ADC_L4',
+    'BAT_POWERH8', 'BAT_POWERM8', 'BAT_POWERL8',
+    'BAT_AVERVOL_H8', 'BAT_AVERVOL_L4', 'BAT_AVERCHGCUR_H8',
+    'BAT_AVERCHGCUR_L4', 'BAT_AVERDISCHGCUR_H8', 'BAT_AVERDISCHGCUR_L5',
+    'APS_AVERVOL_H8', 'APS_AVERVOL_L4',
+    'DCDC_MODESET', 'ADC_EN1', 'ADC_EN2', 'ADC_SPEED', 'ADC_INPUTRANGE',
+    'ADC_IRQ_RETFSET', 'ADC_IRQ_FETFSET', 'TIMER_CTL', 'VBUS_DET_SRP',
+    'HOTOVER_CTL', 'GPIO0_CTL', 'GPIO0_VOL', 'GPIO1_CTL', 'GPIO2_CTL',
+    'GPIO012_SIGNAL', 'GPIO3_CTL',
+    'INT_BAT_CHGCUR_H8', 'INT_BAT_CHGCUR_L4', 'EXT_BAT_CHGCUR_H8',
+    'EXT_BAT_CHGCUR_L4', 'INT_BAT_DISCHGCUR_H8', 'INT_BAT_DISCHGCUR_L4',
+    'EXT_BAT_DISCHGCUR_H8', 'EXT_BAT_DISCHGCUR_L4',
+    'BAT_CHGCOULOMB3', 'BAT_CHGCOULOMB2', 'BAT_CHGCOULOMB1',
+    'BAT_CHGCOULOMB0', 'BAT_DISCHGCOULOMB3', 'BAT_DISCHGCOULOMB2',
+    'BAT_DISCHGCOULOMB1', 'BAT_DISCHGCOULOMB0', 'COULOMB_CTL',
+    'BATT_PERCENTAGE', 'VREF_TEM_CTRL',
+)
+_AXP192_NAMES = (
+    'DC1_VLOTAGE', 'LDO23OUT_VOL',
+    'INTEN1', 'INTEN2', 'INTEN3', 'INTEN4', 'INTEN5',
+    'INTSTS1', 'INTSTS2', 'INTSTS3', 'INTSTS4', 'INTSTS5',
+)
+
+# register: ((field, shift, width), ...) for the bit fields worth
+# spelling out, a width of 1 is a flag
+FIELDS = {
+    constants.AXP202_STATUS: (
+        ('acin_present', 7, 1), ('acin_usable', 6, 1),
+        ('vbus_present', 5, 1), ('vbus_usable', 4, 1),
+        ('vbus_above_vhold', 3, 1), ('batt_charging', 2, 1),
+        ('acin_vbus_short', 1, 1), ('boot_by_acin_vbus', 0, 1)),
+    constants.AXP202_MODE_CHGSTATUS: (
+        ('over_temp', 7, 1), ('charging', 6, 1), ('batt_present', 5, 1),
+        ('batt_active_mode', 3, 1), ('chg_current_low', 2, 1)),
+    constants.AXP202_OFF_CTL: (
+        ('shutdown', 7, 1), ('batt_monitor', 6, 1), ('led_mode', 4, 2),
+        ('led_host', 3, 1), ('off_delay', 0, 2)),
+    constants.AXP202_CHARGE1: (
+        ('enable', 7, 1), ('target', 5, 2), ('current', 0, 4)),
+    constants.AXP202_APS_WARNING1: (('mv', 0, 8),),
+    constants.AXP202_APS_WARNING2: (('mv', 0, 8),),
+    constants.AXP202_ADC_SPEED: (
+        ('rate', 6, 2), ('ts_current', 4, 2), ('ts_adc', 2, 1),
+        ('ts_mode', 0, 2)),
+    constants.AXP202_ADC_INPUTRANGE: (('gpio1_0v7', 1, 1), ('gpio0_0v7', 0, 1)),
+    constants.AXP202_TIMER_CTL: (('timeout', 7, 1), ('minutes', 0, 7)),
+    constants.AXP202_COULOMB_CTL: (
+        ('enable', 7, 1), ('pause', 6, 1), ('clear', 5, 1)),
+    constants.AXP202_BATT_PERCENTAGE: (('invalid', 7, 1), ('percent', 0, 7)),
+}
+
+_names = {}
+
+
+def names(chip):
+    # {register: name} for chip, built once per chip
+    table = _names.get(chip)
+    if table is None:
+        table = {}
+        for name in _AXP202_NAMES:
+            table[getattr(constants, 'AXP202_' + name)] = name
+        if chip == AXP192_CHIP_ID:
+            for name in _AXP192_NAMES:
+                reg = getattr(constants, 'AXP192_' + name)
+                for old in [r for r in table if table[r] == name]:
+                    del table[old]
+                table[reg] = name
+        _names[chip] = table
+    return table
+
+
+def fields(dump, reg):
+    # [(field, value)] of one register, using the chip read from the dump
+    profile = _PROFILES.get(dump[AXP202_IC_TYPE])
+    val = dump[reg]
+    out = []
+    if profile is not None:
+        if reg == constants.AXP202_LDO234_DC23_CTL:
+            for name, bit in sorted(profile.outputs.items(), key=lambda o: o[1]):
+                out.append((name, (val >> bit) & 1))
+        for name, (rreg, mask, shift, low, high, step) in sorted(profile.rails.items()):
+            if rreg == reg:
+                out.append((name + '_mv', low + ((val & mask) >> shift) * step))
+    for name, shift, width in FIELDS.get(reg, ()):
+        field = (val >> shift) & ((1 << width) - 1)
+        if name == 'mv':
+            field = 2867 + field * 28 // 5
+        out.append((name, field))
+    return out
+
+
+def render(dump, regs=None):
+    # One line per named register, or per register in regs:
+    #   0x12 LDO234_DC23_CTL      0x51 exten=1 dc3=0 ldo2=0 ...
+    table = names(dump[AXP202_IC_TYPE])
+    lines = []
+    for reg in (regs if regs is not None else sorted(table)):
+        text = '0x%02X %-20s 0x%02X' % (reg, table.get(reg, '?'), dump[reg])
+        for name, value in fields(dump, reg):
+            text += ' %s=%d' % (name, value)
+        lines.append(text)
+    return lines
+
+
+def diff(a, b):
+    # [(register, old, new)] wherever dump b differs from dump a
+    return [(reg, a[reg], b[reg]) for reg in range(256) if a[reg] != b[reg]]
+
+
+def render_diff(a, b):
+    table = names(b[AXP202_IC_TYPE])
+    return ['0x%02X %-20s 0x%02X -> 0x%02X' % (reg, table.get(reg, '?'), old, new)
+            for reg, old, new in diff(a, b)]
+
+
+def mask(*ranges):
+    # restore() mask from registers and (first, last) ranges
+    out = bytearray(256)
+    for r in ranges:
+        first, last = r if isinstance(r, tuple) else (r, r)
+        for reg in range(first, last + 1):
+            out[reg] = 1
+    return out
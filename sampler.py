@@ -0,0 +1,128 @@
+'''
+MIT License
+
+Copyright (c) 2019 lewis he
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+sampler.py - Fixed-rate ADC sampler for AXP202/AXP192.
+'''
+import gc
+from array import array
+import micropython
+from machine import Timer
+
+from axp202 import ADC_CHANNELS
+
+class Sampler(object):
+    # Captures raw ADC words into a preallocated array('H') ring. Each
+    # sample is one burst read spanning the selected channels; nothing is
+    # allocated until the buffer is drained and converted.
+
+    def __init__(self, pmu, channels=('vbus_voltage', 'vbus_current',
+                                      'batt_charge_current',
+                                      'batt_discharge_current'),
+                 depth=256, timer_id=0):
+        self.pmu = pmu
+        self.channels = tuple(channels)
+        self.width = len(self.channels)
+        self.depth = depth
+        self.sel = pmu.select(*self.channels)
+        self.first = self.sel.first
+        self.span = self.sel.buf
+        self.offsets = array('B', self.sel.offsets)
+        self.lowmask = array('B')
+        self.shift = array('B')
+        for ch in self.sel.channels:
+            bits = pmu.adc_width[ch] - 8
+            if bits > 8:
+                raise ValueError('%s does not fit a 16 bit sample' % ADC_CHANNELS[ch][0])
+            self.lowmask.append((1 << bits) - 1)
+            self.shift.append(bits)
+        self.ring = array('H', bytearray(2 * depth * self.width))
+        self.head = 0
+        self.count = 0
+        self.overruns = 0
+        self.timer_id = timer_id
+        self.timer = None
+        self.sample_cb = self.sample
+
+    def start(self, freq=None):
+        # The chip only refreshes its ADC registers at the configured
+        # sampling rate, polling faster just reads the same words again
+        rate = self.pmu.getAdcSamplingRate()
+        if freq is None or freq > rate:
+            freq = rate
+        # values() converts with the GPIO input range offsets, which the
+        # PMU loads on the first GPIO reading like its getters do
+        if self.sel.gpio and self.pmu.adc_range is None:
+            self.pmu.readChannels(self.sel)
+        gc.collect()
+        self.timer = Timer(self.timer_id)
+        self.timer.init(freq=freq, mode=Timer.PERIODIC, callback=self.__tick)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
+
+    def __tick(self, timer):
+        try:
+            micropython.schedule(self.sample_cb, None)
+        except RuntimeError:
+            self.overruns += 1
+
+    def sample(self, arg=None):
+        buf = self.span
+        self.pmu.read_block(self.first, buf)
+        ring = self.ring
+        base = self.head * self.width
+        for i in range(self.width):
+            o = self.offsets[i]
+            ring[base + i] = (buf[o] << self.shift[i]) | (buf[o + 1] & self.lowmask[i])
+        self.head += 1
+        if self.head == self.depth:
+            self.head = 0
+        if self.count < self.depth:
+            self.count += 1
+        else:
+            self.overruns += 1
+
+    def __len__(self):
+        return self.count
+
+    def raw(self):
+        # oldest to newest raw sample rows, without consuming them
+        start = self.head - self.count
+        for n in range(self.count):
+            base = ((start + n) % self.depth) * self.width
+            yield self.ring[base:base + self.width]
+
+    def values(self):
+        # rows converted like the PMU getters, ints in integer mode
+        convert = self.pmu.convert
+        channels = self.sel.channels
+        for row in self.raw():
+            yield tuple(convert(channels[i], row[i]) for i in range(self.width))
+
+    def drain(self):
+        # convert and consume everything captured so far
+        out = list(self.values())
+        self.count -= len(out)
+        return out
@@ -0,0 +1,108 @@
+'''
+MIT License
+
+Copyright (c) 2019 lewis he
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+scheduler.py - PMU timer duty-cycle scheduler for AXP202/AXP192.
+'''
+from micropython import const
+from axp202 import PowerProfile
+
+_AXP202_LDO234_DC23_CTL = const(0x12)
+
+
+class DutyCycle(object):
+    # Alternates active and sleep windows timed by the PMU's own minute
+    # timer, so nothing on the host has to count time. sleep() switches
+    # the gated rails off and arms the timer; the timer IRQ switches back
+    # on the rails that were on, and calls on_wake(cycle). With
+    # active_minutes set the timer also ends the active window, otherwise
+    # the application calls sleep() when its work is done.
+    #
+    #   cycle = DutyCycle(pmu, rails=('ldo2', 'ldo3'), sleep_minutes=15)
+    #   pmu.attachIRQ()
+    #   cycle.start()
+    #   cycle.sleep()   # the ESP32 can lightsleep with the IRQ pin as wake source
+
+    def __init__(self, pmu, rails=('ldo2', 'ldo3'), sleep_minutes=10,
+                 active_minutes=None, on_wake=None, on_sleep=None):
+        self.pmu = pmu
+        self.rails = tuple(rails)
+        self.sleep_minutes = sleep_minutes
+        self.active_minutes = active_minutes
+        self.on_wake = on_wake
+        self.on_sleep = on_sleep
+        self.gate = PowerProfile(off=self.rails)
+        self.restore = None
+        self.asleep = False
+        self.running = False
+        self.wakeups = 0
+
+    def start(self):
+        self.pmu.onIRQ(self.pmu.profile.timer_irq, self.__on_timer)
+        self.running = True
+        if self.active_minutes:
+            self.pmu.setTimer(self.active_minutes)
+
+    def stop(self):
+        # disarm the timer and leave the rails as they were before sleep()
+        self.running = False
+        self.pmu.removeIRQ(self.__on_timer)
+        with self.pmu.batch():
+            self.pmu.offTimer()
+            self.__wake_rails()
+
+    def sleep(self, minutes=None):
+        if self.asleep:
+            return
+        pmu = self.pmu
+        outputs = pmu.profile.outputs
+        power = pmu.read_byte(_AXP202_LDO234_DC23_CTL)
+        self.restore = PowerProfile(on=[name for name in self.rails
+                                        if power & (1 << outputs[name])])
+        with pmu.batch():
+            pmu.apply_profile(self.gate)
+            pmu.setTimer(minutes or self.sleep_minutes)
+        self.asleep = True
+        if self.on_sleep:
+            self.on_sleep(self)
+
+    def __wake_rails(self):
+        if self.asleep:
+            self.pmu.apply_profile(self.restore)
+            self.asleep = False
+
+    def __on_timer(self, pmu, events):
+        if not self.running:
+            return
+        if not self.asleep:
+            # end of a timed active window
+            self.sleep()
+            return
+        self.wakeups += 1
+        with pmu.batch():
+            if self.active_minutes:
+                pmu.setTimer(self.active_minutes)
+            else:
+                pmu.offTimer()
+            self.__wake_rails()
+        if self.on_wake:
+            self.on_wake(self)
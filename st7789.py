@@ -1,6 +1,7 @@
 import time
 import ustruct
 import framebuf
+import micropython
 from micropython import const
 from machine import Pin, SPI
 
@@ -8,6 +9,7 @@ OPEN_AXP202 = True
 
 if OPEN_AXP202:
     import axp202
+    import constants
 
 
 TFT_RST_PIN = const(0)
@@ -19,6 +21,10 @@ TFT_MISO_PIN = const(2)
 TFT_MOSI_PIN = const(19)
 
 _CHUNK = const(1024)  # maximum number of pixels per spi write
+_CHUNK_CACHE = const(4)  # solid color chunks kept by fill_rectangle
+_STRIPE_ROWS = const(16)  # retained mode rows per stripe without a frame
+_MERGE_SLACK = const(64)  # pixels a merged dirty box may add per merge
+_FRAME_ROWS = const(320)  # rows of panel memory, shown or not
 
 TFT_RAMWR = const(0x2C)
 TFT_SWRST = const(0x01)
@@ -42,6 +48,131 @@ ST7789_INVON = const(0x21)
 ST7789_CASET = const(0x2A)
 ST7789_RASET = const(0x2B)
 ST7789_DISPON = const(0x29)
+ST7789_VSCRDEF = const(0x33)
+ST7789_VSCSAD = const(0x37)
+
+
+# (command, parameters, delay in ms after it) replayed by ST7789.init()
+_INIT_SEQUENCE = (
+    (ST7789_SLPOUT, None, 120),     # Sleep out
+    (ST7789_NORON, None, 0),        # Normal display mode on
+    #------------------------------display and color format setting--------------------------------#
+    (ST7789_MADCTL, bytes((TFT_MAD_COLOR_ORDER,)), 0),
+    (0xB6, b'\x0a\x82', 0),          # JLX240 display datasheet
+    (ST7789_COLMOD, b'\x55', 10),
+    #--------------------------------ST7789V Frame rate setting----------------------------------#
+    (ST7789_PORCTRL, b'\x0c\x0c\x00\x33\x33', 0),
+    (ST7789_GCTRL, b'\x35', 0),      # Voltages: VGH / VGL
+    #---------------------------------ST7789V Power setting--------------------------------------#
+    (ST7789_VCOMS, b'\x28', 0),      # JLX240 display datasheet
+    (ST7789_LCMCTRL, b'\x0c', 0),
+    (ST7789_VDVVRHEN, b'\x01\xff', 0),
+    (ST7789_VRHS, b'\x10', 0),       # voltage VRHS
+    (ST7789_VDVSET, b'\x20', 0),
+    (ST7789_FRCTR2, b'\x0f', 0),
+    (ST7789_PWCTRL1, b'\xa4\xa1', 0),
+    #--------------------------------ST7789V gamma setting---------------------------------------#
+    (ST7789_PVGAMCTRL, b'\xd0\x00\x02\x07\x0a\x28\x32\x44\x42\x06\x0e\x12\x14\x17', 0),
+    (ST7789_NVGAMCTRL, b'\xd0\x00\x02\x07\x0a\x28\x31\x54\x47\x0e\x1c\x17\x1b\x1e', 0),
+    (ST7789_INVON, None, 0),
+    (ST7789_CASET, b'\x00\x00\x00\xe5', 0),      # Column address set, 239
+    (ST7789_RASET, b'\x00\x00\x01\x3f', 120),    # Row address set, 319
+    (ST7789_DISPON, None, 120),     # Display on
+)
+
+
+def _fill_color(buf, hi, lo):
+    # Repeat one RGB565 pixel over buf by slice doubling, log2(n)
+    # memoryview copies instead of a per-pixel loop
+    mv = memoryview(buf)
+    mv[0] = hi
+    mv[1] = lo
+    n = 2
+    size = len(buf)
+    while n < size:
+        k = min(n, size - n)
+        mv[n:n + k] = mv[0:k]
+        n += k
+
+
+def _swap_slices(dst, src, n):
+    dst[0:n:2] = src[1:n:2]
+    dst[1:n:2] = src[0:n:2]
+
+
+def _swap_loop(dst, src, n):
+    for i in range(0, n, 2):
+        dst[i] = src[i + 1]
+        dst[i + 1] = src[i]
+
+
+# _swap16(dst, src, n) byte-swaps n bytes of RGB565. Strided slice
+# assignment is not in every MicroPython build, then viper is the fast
+# fallback and a plain loop the last resort.
+try:
+    _swap_slices(bytearray(4), memoryview(b'\x01\x02\x03\x04'), 4)
+    _swap16 = _swap_slices
+except (NotImplementedError, TypeError, ValueError):
+    _swap16 = _swap_loop
+    if hasattr(micropython, 'viper'):
+        @micropython.viper
+        def _swap16(dst, src, n: int):
+            d = ptr8(dst)  # noqa: F821
+            s = ptr8(src)  # noqa: F821
+            i = 0
+            while i < n:
+                d[i] = s[i + 1]
+                d[i + 1] = s[i]
+                i += 2
+
+
+# source pixels per byte and (first shift, shift step, value mask) of the
+# lookup-table formats blit() expands a byte at a time
+_LUT_FORMATS = {
+    framebuf.MONO_HLSB: (8, 7, -1, 0x01),
+    framebuf.GS4_HMSB: (2, 4, -4, 0x0F),
+    framebuf.GS8: (1, 0, 0, 0xFF),
+}
+
+
+def _intersect(a, b):
+    x0 = max(a[0], b[0])
+    y0 = max(a[1], b[1])
+    x1 = min(a[2], b[2])
+    y1 = min(a[3], b[3])
+    if x0 < x1 and y0 < y1:
+        return (x0, y0, x1, y1)
+    return None
+
+
+def _disjoint(rects):
+    # Split the union of rects into disjoint rectangles that it covers
+    # exactly: bands between the distinct top and bottom edges, merged
+    # x spans per band, and equal spans of adjacent bands joined again
+    ys = sorted(set([r[1] for r in rects] + [r[3] for r in rects]))
+    out = []
+    prev = {}
+    for i in range(len(ys) - 1):
+        y0 = ys[i]
+        y1 = ys[i + 1]
+        spans = sorted((r[0], r[2]) for r in rects if r[1] <= y0 and r[3] >= y1)
+        merged = []
+        for x0, x1 in spans:
+            if merged and x0 <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], x1)
+            else:
+                merged.append([x0, x1])
+        cur = {}
+        for x0, x1 in merged:
+            rect = prev.get((x0, x1))
+            if rect is not None and rect[3] == y0:
+                rect[3] = y1
+            else:
+                rect = [x0, y0, x1, y1]
+                out.append(rect)
+            cur[(x0, x1)] = rect
+        prev = cur
+    return out
 
 
 class ST7789(object):
@@ -49,7 +180,7 @@ class ST7789(object):
     width = 240
     height = 240
 
-    def __init__(self, spi, cs, dc, rst):
+    def __init__(self, spi, cs, dc, rst, chunk_cache=_CHUNK_CACHE):
         self.spi = spi
         self.cs = cs 
         self.dc = dc 
@@ -59,6 +190,18 @@ class ST7789(object):
         if self.rst is not None:
             self.rst.init(self.rst.OUT, value=0)
         self._buf = bytearray(_CHUNK * 2)
+        self._cmd = bytearray(1)
+        self._window = bytearray(4)
+        self._vscrdef = bytearray(6)
+        self._scroll_rows = None  # no scroll area defined yet
+        # prefilled chunks for recently used fill colors, most recent
+        # first, bounded to chunk_cache * _CHUNK * 2 bytes
+        self._chunks = []
+        self._chunk_slots = max(1, chunk_cache)
+        # blit() byte expansion tables, rebuilt when _colormap changes
+        self._luts = {}
+        self._lut_colors = None
+        self._retained = False
         # default white foregraound, black background
         self._colormap = bytearray(b'\x00\x00\xFF\xFF')
 
@@ -83,135 +226,42 @@ class ST7789(object):
         time.sleep(0.5)
 
     def init(self):
-
-        self._write(ST7789_SLPOUT)   # Sleep out
-        time.sleep_ms(120)
-
-        self._write(ST7789_NORON)    # Normal display mode on
-
-        #------------------------------display and color format setting--------------------------------#
-        self._write(ST7789_MADCTL)
-        # self._data(0x00)
-        self._data(TFT_MAD_COLOR_ORDER)
-
-        # JLX240 display datasheet
-        self._write(0xB6)
-        self._data(0x0A)
-        self._data(0x82)
-
-        self._write(ST7789_COLMOD)
-        self._data(0x55)
-        time.sleep_ms(10)
-
-        #--------------------------------ST7789V Frame rate setting----------------------------------#
-        self._write(ST7789_PORCTRL)
-        self._data(0x0c)
-        self._data(0x0c)
-        self._data(0x00)
-        self._data(0x33)
-        self._data(0x33)
-
-        self._write(ST7789_GCTRL)      # Voltages: VGH / VGL
-        self._data(0x35)
-
-        #---------------------------------ST7789V Power setting--------------------------------------#
-        self._write(ST7789_VCOMS)
-        self._data(0x28)        # JLX240 display datasheet
-
-        self._write(ST7789_LCMCTRL)
-        self._data(0x0C)
-
-        self._write(ST7789_VDVVRHEN)
-        self._data(0x01)
-        self._data(0xFF)
-
-        self._write(ST7789_VRHS)       # voltage VRHS
-        self._data(0x10)
-
-        self._write(ST7789_VDVSET)
-        self._data(0x20)
-
-        self._write(ST7789_FRCTR2)
-        self._data(0x0f)
-
-        self._write(ST7789_PWCTRL1)
-        self._data(0xa4)
-        self._data(0xa1)
-
-        #--------------------------------ST7789V gamma setting---------------------------------------#
-        self._write(ST7789_PVGAMCTRL)
-        self._data(0xd0)
-        self._data(0x00)
-        self._data(0x02)
-        self._data(0x07)
-        self._data(0x0a)
-        self._data(0x28)
-        self._data(0x32)
-        self._data(0x44)
-        self._data(0x42)
-        self._data(0x06)
-        self._data(0x0e)
-        self._data(0x12)
-        self._data(0x14)
-        self._data(0x17)
-
-        self._write(ST7789_NVGAMCTRL)
-        self._data(0xd0)
-        self._data(0x00)
-        self._data(0x02)
-        self._data(0x07)
-        self._data(0x0a)
-        self._data(0x28)
-        self._data(0x31)
-        self._data(0x54)
-        self._data(0x47)
-        self._data(0x0e)
-        self._data(0x1c)
-        self._data(0x17)
-        self._data(0x1b)
-        self._data(0x1e)
-
-        self._write(ST7789_INVON)
-
-        self._write(ST7789_CASET)    # Column address set
-        self._data(0x00)
-        self._data(0x00)
-        self._data(0x00)
-        self._data(0xE5)    # 239
-
-        self._write(ST7789_RASET)    # Row address set
-        self._data(0x00)
-        self._data(0x00)
-        self._data(0x01)
-        self._data(0x3F)    # 319
-
-        # /
-
-        time.sleep_ms(120)
-
-        self._write(ST7789_DISPON)  # Display on
-        time.sleep_ms(120)
+        # one CS assertion per command, then the settle delay if any
+        for command, params, delay in _INIT_SEQUENCE:
+            self._write(command, params)
+            if delay:
+                time.sleep_ms(delay)
 
     def _write(self, command, data=None):
-        self.dc(0)
+        # command and its parameters in a single CS assertion
+        self._cmd[0] = command
         self.cs(0)
-        self.spi.write(bytearray([command]))
-        self.cs(1)
+        self.dc(0)
+        self.spi.write(self._cmd)
         if data is not None:
-            self._data(data)
+            self.dc(1)
+            if type(data) == type(1):
+                self._cmd[0] = data
+                data = self._cmd
+            self.spi.write(data)
+        self.cs(1)
 
     def _data(self, data):
         self.dc(1)
         self.cs(0)
         if type(data) == type(1):
-            self.spi.write(bytearray([data]))
-        else:
-            self.spi.write(data)
+            self._cmd[0] = data
+            data = self._cmd
+        self.spi.write(data)
         self.cs(1)
 
     def _writeblock(self, x0, y0, x1, y1, data=None):
-        self._write(ST7789_CASET, ustruct.pack(">HH", x0, x1))
-        self._write(ST7789_RASET, ustruct.pack(">HH", y0, y1))
+        # _window is reused for both address commands, spi.write has
+        # finished with it before it is packed again
+        ustruct.pack_into(">HH", self._window, 0, x0, x1)
+        self._write(ST7789_CASET, self._window)
+        ustruct.pack_into(">HH", self._window, 0, y0, y1)
+        self._write(ST7789_RASET, self._window)
         self._write(TFT_RAMWR, data)
 
     def fill_rectangle(self, x, y, w, h, color=None):
@@ -219,27 +269,66 @@ class ST7789(object):
         y = min(self.height - 1, max(0, y))
         w = min(self.width - x, max(1, w))
         h = min(self.height - y, max(1, h))
-        if color:
-            color = ustruct.pack(">H", color)
-        else:
-            color = self._colormap[0:2]  # background
-        for i in range(_CHUNK):
-            self._buf[2*i] = color[0]
-            self._buf[2*i+1] = color[1]
+        if not color:
+            color = (self._colormap[0] << 8) | self._colormap[1]  # background
+        if self._retained:
+            self._record(('f', color), x, y, w, h)
+            return
+        buf = self._color_chunk(color)
         chunks, rest = divmod(w * h, _CHUNK)
         self._writeblock(x, y, x + w - 1, y + h - 1, None)
         if chunks:
             for count in range(chunks):
-                self._data(self._buf)
+                self._data(buf)
         if rest != 0:
-            mv = memoryview(self._buf)
+            mv = memoryview(buf)
             self._data(mv[:rest*2])
 
-    def blit(self, bitbuff, x, y, w, h):
+    def _color_chunk(self, color):
+        # _CHUNK pixels of color, from the LRU cache or refilled into the
+        # buffer of the least recently used color
+        cache = self._chunks
+        for i in range(len(cache)):
+            if cache[i][0] == color:
+                entry = cache[i]
+                if i:
+                    del cache[i]
+                    cache.insert(0, entry)
+                return entry[1]
+        if len(cache) < self._chunk_slots:
+            buf = bytearray(_CHUNK * 2)
+        else:
+            buf = cache.pop()[1]
+        _fill_color(buf, (color >> 8) & 0xFF, color & 0xFF)
+        cache.insert(0, (color, buf))
+        return buf
+
+    def blit(self, bitbuff, x, y, w, h, fmt=None, stride=None, swap=True):
+        # bitbuff is a FrameBuffer, drawn pixel by pixel through _colormap,
+        # or with fmt the buffer behind one, which is sent row-wise:
+        #   buf = bytearray(240 * 240 * 2)
+        #   fb = framebuf.FrameBuffer(buf, 240, 240, framebuf.RGB565)
+        #   display.blit(buf, 0, 0, 240, 240, framebuf.RGB565)
+        # RGB565 rows go out as memoryview slices, byte-swapped from the
+        # framebuf's little-endian order unless swap=False. MONO_HLSB,
+        # GS4_HMSB and GS8 rows are expanded a source byte at a time.
+        if fmt is not None and fmt != framebuf.RGB565 and fmt not in _LUT_FORMATS:
+            raise ValueError('unsupported format %r' % fmt)
+        if stride is None:
+            stride = w
         x = min(self.width - 1, max(0, x))
         y = min(self.height - 1, max(0, y))
         w = min(self.width - x, max(1, w))
         h = min(self.height - y, max(1, h))
+        if self._retained:
+            self._record(('b', bitbuff, x, y, fmt, stride, swap), x, y, w, h)
+            return
+        if fmt == framebuf.RGB565:
+            self._blit_rgb565(bitbuff, x, y, w, h, stride, swap)
+            return
+        if fmt in _LUT_FORMATS:
+            self._blit_lut(bitbuff, x, y, w, h, stride, fmt)
+            return
         chunks, rest = divmod(w * h, _CHUNK)
         self._writeblock(x, y, x + w - 1, y + h - 1, None)
         written = 0
@@ -258,10 +347,351 @@ class ST7789(object):
             mv = memoryview(self._buf)
             self._data(mv[:rest*2])
 
+    def _blit_rgb565(self, buf, x, y, w, h, stride, swap):
+        src = memoryview(buf)
+        row = w * 2
+        pitch = stride * 2
+        self._writeblock(x, y, x + w - 1, y + h - 1, None)
+        if not swap:
+            if pitch == row:
+                # contiguous rows, stream the whole block in chunks
+                end = row * h
+                for i in range(0, end, _CHUNK * 2):
+                    self._data(src[i:min(end, i + _CHUNK * 2)])
+            else:
+                for iy in range(h):
+                    self._data(src[iy * pitch:iy * pitch + row])
+            return
+        out = memoryview(self._buf)
+        rows = max(1, len(self._buf) // row)
+        for iy in range(0, h, rows):
+            n = min(rows, h - iy)
+            if pitch == row:
+                _swap16(out, src[iy * pitch:], n * row)
+            else:
+                for r in range(n):
+                    start = (iy + r) * pitch
+                    _swap16(out[r * row:], src[start:start + row], row)
+            self._data(out[:n * row])
+
+    def _lut(self, fmt):
+        # byte -> RGB565 bytes of the pixels it holds. Levels are spread
+        # evenly from the background to the foreground of _colormap.
+        if self._lut_colors != self._colormap:
+            self._luts = {}
+            self._lut_colors = bytearray(self._colormap)
+        lut = self._luts.get(fmt)
+        if lut is not None:
+            return lut
+        per, shift, step, mask = _LUT_FORMATS[fmt]
+        cm = self._colormap
+        bg = (cm[0] << 8) | cm[1]
+        fg = (cm[2] << 8) | cm[3]
+        levels = []
+        for i in range(mask + 1):
+            c = 0
+            for lo, bits in ((0, 0x1F), (5, 0x3F), (11, 0x1F)):
+                b = (bg >> lo) & bits
+                f = (fg >> lo) & bits
+                c |= (b + (f - b) * i // mask) << lo
+            levels.append(c)
+        lut = bytearray(256 * per * 2)
+        o = 0
+        for byte in range(256):
+            for p in range(per):
+                c = levels[(byte >> (shift + step * p)) & mask]
+                lut[o] = c >> 8
+                lut[o + 1] = c & 0xFF
+                o += 2
+        self._luts[fmt] = lut
+        return lut
+
+    def _blit_lut(self, buf, x, y, w, h, stride, fmt):
+        per = _LUT_FORMATS[fmt][0]
+        lut = memoryview(self._lut(fmt))
+        span = per * 2  # output bytes per source byte
+        pitch = (stride + per - 1) // per
+        nbytes = (w + per - 1) // per
+        row = w * 2
+        # rows are packed back to back, the padding of a partial last
+        # byte spills into the next row and is overwritten by it
+        out = memoryview(self._buf)
+        rows = max(1, (len(self._buf) - span) // row)
+        src = memoryview(buf)
+        self._writeblock(x, y, x + w - 1, y + h - 1, None)
+        for iy in range(0, h, rows):
+            n = min(rows, h - iy)
+            for r in range(n):
+                o = r * row
+                start = (iy + r) * pitch
+                for b in src[start:start + nbytes]:
+                    i = b * span
+                    out[o:o + span] = lut[i:i + span]
+                    o += span
+            self._data(out[:n * row])
+
+    # Vertical scrolling. set_scroll_area() splits the screen into a
+    # fixed top, a scrolling middle and a fixed bottom band. scroll()
+    # moves the middle by whole lines with VSCSAD and draws only the
+    # lines it exposes. Panel memory rows below the visible height are
+    # counted into the fixed bottom area so the middle wraps on screen.
+
+    def set_scroll_area(self, top=0, bottom=0):
+        top = min(self.height - 1, max(0, top))
+        bottom = min(self.height - 1 - top, max(0, bottom))
+        self._scroll_top = top
+        self._scroll_rows = self.height - top - bottom
+        ustruct.pack_into(">HHH", self._vscrdef, 0, top, self._scroll_rows,
+                          _FRAME_ROWS - top - self._scroll_rows)
+        self._write(ST7789_VSCRDEF, self._vscrdef)
+        self.set_scroll(0)
+
+    def set_scroll(self, offset):
+        # show line offset of the scroll area at its top
+        if self._scroll_rows is None:
+            self.set_scroll_area()
+        if self._retained:
+            self.flush()
+        self._scroll = offset % self._scroll_rows
+        ustruct.pack_into(">H", self._window, 0, self._scroll_top + self._scroll)
+        self._write(ST7789_VSCSAD, memoryview(self._window)[:2])
+
+    def scroll_y(self, y):
+        # memory row shown at screen row y, to draw into the scroll area
+        if self._scroll_rows is None:
+            return y
+        top = self._scroll_top
+        if top <= y < top + self._scroll_rows:
+            return top + (y - top + self._scroll) % self._scroll_rows
+        return y
+
+    def scroll(self, lines, buf=None, fmt=framebuf.RGB565, stride=None,
+               swap=True, color=None):
+        # Scroll the area up by lines, down when negative, and draw the
+        # exposed lines from buf, the raw width x abs(lines) buffer in
+        # fmt as for blit(), or fill them with color
+        if fmt != framebuf.RGB565 and fmt not in _LUT_FORMATS:
+            raise ValueError('unsupported format %r' % fmt)
+        if self._scroll_rows is None:
+            self.set_scroll_area()
+        rows = self._scroll_rows
+        top = self._scroll_top
+        n = min(rows, abs(lines))
+        self.set_scroll(self._scroll + lines)
+        if not n:
+            return
+        if lines > 0:
+            y = self.scroll_y(top + rows - n)
+        else:
+            y = self.scroll_y(top)
+        if stride is None:
+            stride = self.width
+        if fmt == framebuf.RGB565:
+            pitch = stride * 2
+        else:
+            per = _LUT_FORMATS[fmt][0]
+            pitch = (stride + per - 1) // per
+        # the band is split where it wraps from the bottom of the area
+        first = min(n, top + rows - y)
+        for row, my, count in ((0, y, first), (first, top, n - first)):
+            if not count:
+                continue
+            if buf is None:
+                self.fill_rectangle(0, my, self.width, count, color)
+            else:
+                self.blit(memoryview(buf)[row * pitch:], 0, my, self.width,
+                          count, fmt, stride, swap)
+        if self._retained:
+            self.flush()
+
+    # Retained mode: drawing goes to RAM and flush() sends only what
+    # changed. With a full frame buffer (in PSRAM where the heap has it) draws are
+    # painted into it and dirty rectangles are merged, but only over
+    # pixels drawn since retain(), the rest of the frame does not hold
+    # what the panel shows. When the frame does not fit, or stripe_rows
+    # is given, draws are kept as a list and flush() repaints the changed
+    # area stripe by stripe; blit() sources must then stay unchanged
+    # until the flush.
+
+    def retain(self, stripe_rows=None):
+        self._frame = None
+        self._stripe = None
+        self._ops = []
+        self._dirty = []
+        if stripe_rows is None:
+            try:
+                self._frame = bytearray(self.width * self.height * 2)
+            except MemoryError:
+                stripe_rows = _STRIPE_ROWS
+        if self._frame is None:
+            self._stripe = bytearray(self.width * stripe_rows * 2)
+        else:
+            # known span [x0, x1) of each row, empty until drawn
+            self._known = ([0] * self.height, [0] * self.height)
+            self._unknown_rows = self.height
+        self._retained = True
+
+    def immediate(self):
+        # flush and go back to drawing straight to the panel
+        self.flush()
+        self._retained = False
+        self._frame = None
+        self._known = None
+        self._stripe = None
+        self._ops = []
+
+    def _record(self, op, x, y, w, h):
+        rect = [x, y, x + w, y + h]
+        if self._frame is not None:
+            self._paint(self._frame, self.width, 0, 0, rect, op)
+            self._learn(rect)
+            self._merge(rect)
+        else:
+            # without a frame only drawn pixels can be repainted, so the
+            # dirty area stays the exact union of the ops
+            self._ops.append((op, rect))
+            self._dirty.append(rect)
+
+    def _learn(self, rect):
+        # Widen the known span of each row of rect. Spans only join when
+        # they overlap or touch, so they never cover pixels not drawn.
+        if self._unknown_rows == 0:
+            return
+        x0s, x1s = self._known
+        x0, y0, x1, y1 = rect
+        for y in range(y0, y1):
+            if x0 <= x1s[y] and x1 >= x0s[y]:
+                full = x1s[y] - x0s[y] == self.width
+                x0s[y] = min(x0s[y], x0)
+                x1s[y] = max(x1s[y], x1)
+            elif x1 - x0 > x1s[y] - x0s[y]:
+                full = False
+                x0s[y] = x0
+                x1s[y] = x1
+            else:
+                continue
+            if not full and x1s[y] - x0s[y] == self.width:
+                self._unknown_rows -= 1
+
+    def _known_rect(self, x0, y0, x1, y1):
+        if self._unknown_rows == 0:
+            return True
+        x0s, x1s = self._known
+        for y in range(y0, y1):
+            if x0s[y] > x0 or x1s[y] < x1:
+                return False
+        return True
+
+    def _merge(self, rect):
+        # Add rect to the dirty list, joining two rectangles into their
+        # bounding box while that costs no more than sending both and
+        # every pixel of the box is known
+        dirty = self._dirty
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(dirty)):
+                r = dirty[i]
+                x0 = min(r[0], rect[0])
+                y0 = min(r[1], rect[1])
+                x1 = max(r[2], rect[2])
+                y1 = max(r[3], rect[3])
+                area = (r[2] - r[0]) * (r[3] - r[1]) + \
+                    (rect[2] - rect[0]) * (rect[3] - rect[1]) + _MERGE_SLACK
+                if (x1 - x0) * (y1 - y0) <= area and \
+                        self._known_rect(x0, y0, x1, y1):
+                    rect = [x0, y0, x1, y1]
+                    del dirty[i]
+                    merged = True
+                    break
+        dirty.append(rect)
+
+    def flush(self):
+        # Send the dirty area as disjoint rectangles, so overlaps left by
+        # _merge go out once, with one _writeblock window each
+        if not self._retained or not self._dirty:
+            return
+        if self._frame is not None:
+            frame = memoryview(self._frame)
+            pitch = self.width * 2
+            for x0, y0, x1, y1 in _disjoint(self._dirty):
+                row = (x1 - x0) * 2
+                self._writeblock(x0, y0, x1 - 1, y1 - 1, None)
+                if row == pitch:
+                    end = y1 * pitch
+                    for i in range(y0 * pitch, end, _CHUNK * 2):
+                        self._data(frame[i:min(end, i + _CHUNK * 2)])
+                else:
+                    for y in range(y0, y1):
+                        i = y * pitch + x0 * 2
+                        self._data(frame[i:i + row])
+        else:
+            stripe = memoryview(self._stripe)
+            for x0, y0, x1, y1 in _disjoint(self._dirty):
+                w = x1 - x0
+                rows = len(self._stripe) // (w * 2)
+                self._writeblock(x0, y0, x1 - 1, y1 - 1, None)
+                for sy in range(y0, y1, rows):
+                    band = [x0, sy, x1, min(y1, sy + rows)]
+                    for op, rect in self._ops:
+                        clip = _intersect(rect, band)
+                        if clip is not None:
+                            self._paint(stripe, w, x0, sy, clip, op)
+                    self._data(stripe[:(band[3] - sy) * w * 2])
+            self._ops = []
+        self._dirty = []
+
+    def _paint(self, dst, pitch, ox, oy, clip, op):
+        # Draw the part of op inside clip into dst, a pitch pixels wide
+        # RGB565 buffer whose first pixel is screen (ox, oy)
+        x0, y0, x1, y1 = clip
+        n = (x1 - x0) * 2
+        if op[0] == 'f':
+            chunk = memoryview(self._color_chunk(op[1]))
+            for y in range(y0, y1):
+                i = ((y - oy) * pitch + x0 - ox) * 2
+                for j in range(0, n, _CHUNK * 2):
+                    k = min(n - j, _CHUNK * 2)
+                    dst[i + j:i + j + k] = chunk[:k]
+            return
+        src, x, y, fmt, stride, swap = op[1:]
+        for sy in range(y0, y1):
+            i = ((sy - oy) * pitch + x0 - ox) * 2
+            if fmt == framebuf.RGB565:
+                start = ((sy - y) * stride + x0 - x) * 2
+                if swap:
+                    _swap16(memoryview(dst)[i:], memoryview(src)[start:], n)
+                else:
+                    dst[i:i + n] = memoryview(src)[start:start + n]
+            elif fmt in _LUT_FORMATS:
+                # expand from the byte holding the first pixel into _buf,
+                # then copy the clipped pixels
+                per = _LUT_FORMATS[fmt][0]
+                lut = memoryview(self._lut(fmt))
+                span = per * 2
+                first = x0 - x
+                start = (sy - y) * ((stride + per - 1) // per) + first // per
+                count = (first % per + x1 - x0 + per - 1) // per
+                out = memoryview(self._buf)
+                o = 0
+                for b in memoryview(src)[start:start + count]:
+                    out[o:o + span] = lut[b * span:b * span + span]
+                    o += span
+                skip = (first % per) * 2
+                dst[i:i + n] = out[skip:skip + n]
+            else:
+                cm = self._colormap
+                for sx in range(x0, x1):
+                    c = src.pixel(sx - x, sy - y)
+                    dst[i] = cm[c * 2]
+                    dst[i + 1] = cm[c * 2 + 1]
+                    i += 2
+
+
 if OPEN_AXP202:
     a = axp202.PMU()
-    a.setChgLEDMode(axp202.AXP20X_LED_BLINK_1HZ)
-    a.enablePower(axp202.AXP202_LDO2)
+    a.setChgLEDMode(constants.AXP20X_LED_BLINK_1HZ)
+    a.enablePower(constants.AXP202_LDO2)
     a.setLDO2Voltage(3300)
 bl = Pin(TFT_LED_PIN, Pin.OUT)
 bl.value(1)